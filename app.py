@@ -1,24 +1,38 @@
-from flask import Flask, redirect, url_for, render_template
+from flask import Flask, redirect, url_for, render_template, jsonify
 from config import Config
 from models import db, User
+from count_history import count_history
 from werkzeug.security import generate_password_hash
+from werkzeug.serving import WSGIRequestHandler
 from flask_jwt_extended import JWTManager
 from blueprints.auth import auth_bp
 from blueprints.dashboard import dashboard_bp
 from blueprints.feeds import feeds_bp
 from blueprints.analysis import analysis_bp
 from blueprints.admin_panel import admin_panel_bp
+from blueprints.metrics import metrics_bp
+from yolo_service import preload_model, model_status
 import os
+import signal
+import sys
 
 app = Flask(__name__)
+# HTTP/1.1 keeps client connections open, so cameras pushing frames do not reconnect per request
+WSGIRequestHandler.protocol_version = "HTTP/1.1"
 app.config.from_object(Config)
 app.secret_key = "your-flask-secret-key"
 app.config["JWT_SECRET_KEY"] = "super-secret-jwt-key"
 
+# INFERENCE_MODE=process workers are spawned and re-import this module as __mp_main__;
+# they only need the model, so the app's side effects only happen in the real server process
+server_process = __name__ != "__mp_main__"
+
 jwt = JWTManager(app)
 db.init_app(app)
-with app.app_context():
-    db.create_all()
+if server_process:
+    with app.app_context():
+        db.create_all()
+    count_history.init_app(app)
 
 # Register blueprints
 app.register_blueprint(auth_bp)
@@ -26,11 +40,24 @@ app.register_blueprint(dashboard_bp)
 app.register_blueprint(feeds_bp)
 app.register_blueprint(analysis_bp)
 app.register_blueprint(admin_panel_bp)
+app.register_blueprint(metrics_bp)
 
 @app.route("/")
 def index():
     return redirect(url_for("auth.login"))
 
+@app.route("/ready")
+def ready():
+    """Readiness probe: 200 once the default YOLO model is loaded and warmed up, 503 before."""
+    status = model_status()
+    return jsonify(status), (200 if status["ready"] else 503)
+
+# Load the model in the background so startup and non-analysis pages never wait for it
+if app.config["MODEL_PRELOAD"] and server_process:
+    preload_model()
+
 if __name__ == "__main__":
+    # Exit normally on SIGTERM (process managers), so atexit hooks stop the inference workers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=False)
     # app.run(debug=True)
@@ -0,0 +1,179 @@
+"""Per-stage timings of the analysis pipeline for 1..N concurrent feeds.
+
+Generates a synthetic crowd video (see ``benchmarks.synthetic_video``), then runs
+the real ``yolo_service.run_analysis`` loop on it for each feed count with the
+deterministic StubDetector in place of YOLO, so it runs on a CPU-only machine
+without weights. Every feed has one stream viewer unless ``--viewers 0``, so
+drawing and encoding are measured too. Results are written as JSON (by default
+``benchmarks/results/<commit>.json``) and can be compared with an earlier run:
+
+    python -m benchmarks.bench_pipeline --feeds 1 2 4 --size 1280 720 --people 60
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/<old commit>.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+
+import yolo_service
+from benchmarks.stub_detector import StubDetector
+from benchmarks.synthetic_video import write_synthetic_video
+from inference_scheduler import InferenceScheduler
+from stage_timer import STAGES
+from trackers import TRACKERS
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def grid_zones(n, width, height):
+    """``n`` side-by-side rectangular zones covering the frame."""
+    step = width / max(n, 1)
+    return [[(i * step, 0), ((i + 1) * step, 0), ((i + 1) * step, height), (i * step, height)] for i in range(n)]
+
+
+def watch(broadcaster):
+    """A stream viewer that takes every frame and throws it away."""
+    for _ in broadcaster.subscribe():
+        pass
+
+
+def run_feeds(video, n_feeds, args):
+    detector = StubDetector(args.call_ms, args.frame_ms)
+    scheduler = InferenceScheduler(detector, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    # Plug the stub into the real pipeline; the cache would turn reruns into replays
+    yolo_service.scheduler = scheduler
+    yolo_service.person_class_id = lambda: 0
+    yolo_service.detection_cache = None
+
+    width, height = args.size
+    zones = grid_zones(args.zones, width, height)
+    feed_ids = [f"bench-{i}" for i in range(n_feeds)]
+    viewers = []
+    for feed_id in feed_ids:
+        yolo_service.set_tracker(feed_id, None)  # fresh tracks for every run
+        if args.tracker:
+            yolo_service.set_tracker(feed_id, args.tracker)
+        else:
+            yolo_service.toggle_deepsort(feed_id, args.tracking)
+        broadcaster = yolo_service.get_broadcaster(feed_id)
+        for _ in range(args.viewers):
+            thread = threading.Thread(target=watch, args=(broadcaster,), daemon=True)
+            thread.start()
+            viewers.append(thread)
+        while broadcaster.subscribers < args.viewers:
+            time.sleep(0.001)
+
+    started = time.perf_counter()
+    threads = [yolo_service.start_analysis(feed_id, video, zones, realtime=False, target_fps=0)
+               for feed_id in feed_ids]
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats = {feed_id: dict(yolo_service.get_stats(feed_id)) for feed_id in feed_ids}
+    for feed_id in feed_ids:
+        yolo_service.stop_analysis(feed_id)
+    for thread in viewers:
+        thread.join(timeout=2.0)
+
+    frames = sum(s.get("frames_analyzed", 0) for s in stats.values())
+    stage_ms = {}
+    for stage in STAGES:
+        weighted = [(s["stage_ms"][stage], s["frames_analyzed"]) for s in stats.values()
+                    if stage in s.get("stage_ms", {})]
+        if weighted:
+            stage_ms[stage] = round(sum(ms * n for ms, n in weighted) / sum(n for _, n in weighted), 3)
+    return {
+        "feeds": n_feeds,
+        "frames": frames,
+        "elapsed_seconds": round(elapsed, 3),
+        "fps_total": round(frames / elapsed, 2) if elapsed > 0 else None,
+        "fps_per_feed": round(frames / elapsed / n_feeds, 2) if elapsed > 0 else None,
+        "avg_batch_size": round(scheduler.frames_run / max(scheduler.batches_run, 1), 2),
+        "stage_ms": stage_ms,
+    }
+
+
+def print_runs(runs, baseline=None):
+    base = {run["feeds"]: run for run in (baseline or {}).get("runs", [])}
+    stages = [stage for stage in STAGES if any(stage in run["stage_ms"] for run in runs)]
+    print(f"{'feeds':>5}  {'fps/feed':>8}  {'batch':>5}  " + "  ".join(f"{stage[:11]:>11}" for stage in stages))
+    for run in runs:
+        cells = []
+        for stage in stages:
+            ms = run["stage_ms"].get(stage)
+            old = base.get(run["feeds"], {}).get("stage_ms", {}).get(stage)
+            cell = "-" if ms is None else f"{ms:.2f}"
+            if ms is not None and old:
+                cell += f" {(ms - old) / old:+.0%}"
+            cells.append(f"{cell:>11}")
+        print(f"{run['feeds']:>5}  {run['fps_per_feed']:>8.1f}  {run['avg_batch_size']:>5.2f}  " + "  ".join(cells))
+    print("(stage columns are mean ms per frame" + (", change vs baseline)" if base else ")"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 360], metavar=("W", "H"))
+    parser.add_argument("--frames", type=int, default=150, help="frames in the synthetic video")
+    parser.add_argument("--people", type=int, default=20, help="crowd density of the synthetic video")
+    parser.add_argument("--zones", type=int, default=4)
+    parser.add_argument("--viewers", type=int, default=1, help="stream viewers per feed (0 skips draw/encode)")
+    parser.add_argument("--tracking", action="store_true", help="enable tracking with the configured TRACKER")
+    parser.add_argument("--tracker", choices=TRACKERS, help="enable tracking with this tracker")
+    parser.add_argument("--call-ms", type=float, default=0, help="stub per-call model overhead")
+    parser.add_argument("--frame-ms", type=float, default=0, help="stub per-frame model cost")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_synthetic_video(os.path.join(tmp, "crowd.mp4"), *args.size, args.frames,
+                                      args.people, seed=args.seed)
+        runs = [run_feeds(video, n, args) for n in args.feeds]
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "platform": platform.platform(),
+        "python": sys.version.split()[0],
+        "opencv": cv2.__version__,
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "runs": runs,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"baseline: {baseline.get('commit')} ({args.compare})")
+    print_runs(runs, baseline)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Frames/sec of the shared inference path versus the number of concurrent feeds.
+
+Compares serialized batch-of-1 calls (the old behaviour) with the cross-feed
+InferenceScheduler. By default a stub model is used whose cost is a fixed
+per-call overhead plus a per-frame cost, so the benchmark runs without weights.
+
+    python -m benchmarks.bench_scheduler
+    python -m benchmarks.bench_scheduler --weights yolov8n.pt --feeds 1 4 8 16
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from inference_scheduler import InferenceScheduler
+
+
+class StubModel:
+    """Sleeps like a model would: call overhead + per-frame cost, GIL released."""
+
+    def __init__(self, call_ms, frame_ms):
+        self.call_s = call_ms / 1000.0
+        self.frame_s = frame_ms / 1000.0
+
+    def __call__(self, frames, **kwargs):
+        time.sleep(self.call_s + self.frame_s * len(frames))
+        return [None] * len(frames)
+
+
+def load_model(args):
+    if args.weights:
+        from ultralytics import YOLO
+        model = YOLO(args.weights)
+        return lambda frames, **kw: model(frames, verbose=False, **kw)
+    return StubModel(args.call_ms, args.frame_ms)
+
+
+def run_feeds(scheduler, n_feeds, frames_per_feed, frame):
+    def feed_loop():
+        scheduler.register()
+        try:
+            for _ in range(frames_per_feed):
+                scheduler.infer(frame)
+        finally:
+            scheduler.unregister()
+
+    threads = [threading.Thread(target=feed_loop) for _ in range(n_feeds)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return n_feeds * frames_per_feed / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--frames", type=int, default=50, help="frames per feed")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--weights", help="real YOLO weights instead of the stub model")
+    parser.add_argument("--call-ms", type=float, default=20, help="stub per-call overhead")
+    parser.add_argument("--frame-ms", type=float, default=4, help="stub per-frame cost")
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 360], metavar=("W", "H"))
+    args = parser.parse_args()
+
+    run_batch = load_model(args)
+    frame = np.zeros((args.size[1], args.size[0], 3), dtype=np.uint8)
+
+    print(f"{'feeds':>5}  {'serial fps':>10}  {'batched fps':>11}  {'speedup':>7}  {'avg batch':>9}")
+    for n in args.feeds:
+        serial = InferenceScheduler(run_batch, max_batch_size=1, max_wait_ms=0, name="serial")
+        batched = InferenceScheduler(run_batch, max_batch_size=args.max_batch_size,
+                                     max_wait_ms=args.max_wait_ms, name="batched")
+        serial_fps = run_feeds(serial, n, args.frames, frame)
+        batched_fps = run_feeds(batched, n, args.frames, frame)
+        avg_batch = batched.frames_run / max(batched.batches_run, 1)
+        print(f"{n:>5}  {serial_fps:>10.1f}  {batched_fps:>11.1f}  {batched_fps / serial_fps:>6.2f}x  {avg_batch:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
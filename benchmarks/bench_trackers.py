@@ -0,0 +1,107 @@
+"""Speed and ID stability of the trackers on a synthetic crowd with known identities.
+
+People walk and cross paths as in ``benchmarks.synthetic_video``. The
+detections fed to each tracker are the true boxes with pixel jitter, a share
+of missed detections and random confidences, so every tracker sees exactly
+the same input. DeepSort is included when deep_sort_realtime is installed.
+
+    python -m benchmarks.bench_trackers --size 1280 720 --people 60 --frames 300
+    python -m benchmarks.bench_trackers --interval 4   # detector on keyframes only
+
+Reported per tracker: update time per frame, ID switches (a person's matched
+track id changes), track ids used per person, and coverage (share of true
+boxes matched by a reported track at IoU >= 0.5).
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_video import synthetic_frames
+from postprocess import box_iou
+from trackers import TRACKERS, create_tracker, deepsort_available, match_iou
+
+
+def noisy_detections(boxes, rng, jitter, miss):
+    """Detector stand-in: true boxes with jitter, some missed, random confidences."""
+    kept = boxes[rng.random(len(boxes)) >= miss].astype(float)
+    kept += rng.normal(0, jitter, size=kept.shape)
+    return kept, rng.uniform(0.3, 0.95, size=len(kept))
+
+
+def run_tracker(kind, frames, truth, detections, interval):
+    tracker = create_tracker(kind, max_age=30, n_init=1)
+    seconds, outputs = [], []
+    for i, frame in enumerate(frames):
+        started = time.perf_counter()
+        if i % interval == 0:
+            boxes, confs = detections[i]
+            outputs.append(tracker.update(boxes, confs, frame))
+        else:
+            outputs.append(tracker.predict(frame))
+        seconds.append(time.perf_counter() - started)
+
+    switches, matched, total = 0, 0, 0
+    last_id, ids_per_person = {}, {}
+    for boxes, (track_ids, tracked) in zip(truth, outputs):
+        total += len(boxes)
+        rows, cols = match_iou(box_iou(boxes, tracked), 0.5)
+        matched += len(rows)
+        for person, col in zip(rows.tolist(), cols.tolist()):
+            track_id = track_ids[col]
+            if person in last_id and last_id[person] != track_id:
+                switches += 1
+            last_id[person] = track_id
+            ids_per_person.setdefault(person, set()).add(track_id)
+
+    seconds = np.array(seconds) * 1000
+    return {
+        "tracker": kind,
+        "ms_per_frame": round(float(seconds.mean()), 3),
+        "p95_ms": round(float(np.percentile(seconds, 95)), 3),
+        "id_switches": switches,
+        "ids_per_person": round(float(np.mean([len(ids) for ids in ids_per_person.values()])), 2)
+        if ids_per_person else None,
+        "coverage": round(matched / total, 4) if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 360], metavar=("W", "H"))
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--people", type=int, default=30)
+    parser.add_argument("--jitter", type=float, default=2.0, help="detection noise in pixels")
+    parser.add_argument("--miss", type=float, default=0.05, help="share of people missed per frame")
+    parser.add_argument("--interval", type=int, default=1, help="run the detector every N frames")
+    parser.add_argument("--trackers", nargs="+", choices=TRACKERS, default=list(TRACKERS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frames, truth, detections = [], [], []
+    for frame, boxes in synthetic_frames(*args.size, args.frames, args.people, args.seed):
+        frames.append(frame.copy())
+        truth.append(boxes)
+        detections.append(noisy_detections(boxes, rng, args.jitter, args.miss))
+
+    results = []
+    for kind in args.trackers:
+        if kind == "deepsort" and not deepsort_available:
+            print("deepsort: skipped, deep_sort_realtime is not installed")
+            continue
+        results.append(run_tracker(kind, frames, truth, detections, max(1, args.interval)))
+
+    print(f"{'tracker':>10}  {'ms/frame':>8}  {'p95 ms':>7}  {'switches':>8}  {'ids/person':>10}  {'coverage':>8}")
+    for r in results:
+        print(f"{r['tracker']:>10}  {r['ms_per_frame']:>8.3f}  {r['p95_ms']:>7.3f}  {r['id_switches']:>8}  "
+              f"{r['ids_per_person']:>10}  {r['coverage']:>8}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import time
+
+import cv2
+import numpy as np
+
+from postprocess import Detections
+
+
+class StubDetector:
+    """Deterministic stand-in for the YOLO batch call, no weights needed.
+
+    Finds the bright boxes of ``benchmarks.synthetic_video`` frames by
+    thresholding a downscaled grey image, and can additionally sleep like a
+    real model (per-call overhead plus per-frame cost, GIL released). Has the
+    same signature as ``detector.run_model_batch``; every box is class 0
+    with confidence 0.9.
+    """
+
+    def __init__(self, call_ms=0.0, frame_ms=0.0, scale=0.5, threshold=150):
+        self.call_s = call_ms / 1000.0
+        self.frame_s = frame_ms / 1000.0
+        self.scale = scale
+        self.threshold = threshold
+        self.calls = 0
+
+    def detect(self, frame):
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_NEAREST)
+        grey = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(grey, self.threshold, 255, cv2.THRESH_BINARY)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        boxes = stats[1:, :4].astype(np.float32) / self.scale  # x, y, w, h
+        boxes[:, 2:] += boxes[:, :2]
+        return Detections(boxes, np.full(n - 1, 0.9, dtype=np.float32), np.zeros(n - 1, dtype=np.int32))
+
+    def __call__(self, frames, **kwargs):
+        self.calls += 1
+        if self.call_s or self.frame_s:
+            time.sleep(self.call_s + self.frame_s * len(frames))
+        return [self.detect(frame) for frame in frames]
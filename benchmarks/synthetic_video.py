@@ -0,0 +1,68 @@
+"""Synthetic crowd videos for benchmarks.
+
+Bright rectangles ("people") walk across a dark background and bounce off the
+edges. The same seed always produces the same video, and the stub detector in
+``benchmarks.stub_detector`` finds exactly these rectangles.
+
+    python -m benchmarks.synthetic_video /tmp/crowd.mp4 --size 1280 720 --people 50
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+
+def synthetic_frames(width=640, height=360, frames=150, people=20, seed=0):
+    """Yield ``(frame, boxes)`` for each frame; row ``i`` of the (people x 4) xyxy ``boxes`` is always person ``i``.
+
+    The frame buffer is reused, copy it to keep it.
+    """
+    rng = np.random.default_rng(seed)
+    box_h = max(8, height // 6)
+    box_w = max(4, box_h // 3)
+    pos = rng.uniform([0, 0], [width - box_w, height - box_h], size=(people, 2))
+    vel = rng.uniform(-3, 3, size=(people, 2)) * (height / 360.0)
+    colors = rng.integers(180, 256, size=(people, 3)).tolist()
+
+    # Dark gradient background, so encoding is not trivially cheap
+    background = np.zeros((height, width, 3), dtype=np.uint8)
+    background[:] = np.linspace(20, 90, width, dtype=np.uint8)[None, :, None]
+
+    frame = np.empty_like(background)
+    for _ in range(frames):
+        np.copyto(frame, background)
+        corners = pos.astype(int)
+        for (x, y), color in zip(corners.tolist(), colors):
+            cv2.rectangle(frame, (x, y), (x + box_w, y + box_h), color, -1)
+        yield frame, np.concatenate([corners, corners + [box_w, box_h]], axis=1)
+        pos += vel
+        bounce = (pos < 0) | (pos > [width - box_w, height - box_h])
+        vel[bounce] *= -1
+        np.clip(pos, 0, [width - box_w, height - box_h], out=pos)
+
+
+def write_synthetic_video(path, width=640, height=360, frames=150, people=20, fps=25.0, seed=0):
+    """Write an mp4 with ``people`` moving boxes to ``path`` and return the path."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot write video: {path}")
+    for frame, _ in synthetic_frames(width, height, frames, people, seed):
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 360], metavar=("W", "H"))
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--people", type=int, default=20)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_video(args.path, *args.size, args.frames, args.people, args.fps, args.seed)
+
+
+if __name__ == "__main__":
+    main()
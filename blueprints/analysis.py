@@ -1,12 +1,39 @@
-from flask import Blueprint, jsonify, request, Response, render_template, send_file
+from flask import Blueprint, jsonify, request, Response, render_template, send_file, stream_with_context
 from models import Feed, Zone
-from yolo_service import start_analysis, stop_analysis, get_counts, get_detections, toggle_deepsort, generate_frames
-from helpers import scale_zones, login_required
+from yolo_service import start_analysis, stop_analysis, get_counts, get_detections, get_stats, get_versioned_result, toggle_deepsort, set_tracker, get_tracker, set_motion_gate, get_motion_gate, set_keyframes, get_keyframes, set_inference_plan, get_inference_plan, set_inference_settings, get_inference_settings, generate_frames, generate_events, feed_zone_index
+from helpers import login_required
+from zone_cache import zone_cache
+from postprocess import detections_to_columns, detections_to_dicts, pack_detections
+from count_history import query_history, summarize_history, parse_utc, utcnow, TOTAL_ZONE
+from offline_analysis import offline_jobs, probe_video, prune_offline_jobs, start_offline_job, write_csv
+from tracing import span_buffers, feed_log, configure_feed_log
+from ingestion import FrameIngestor, iter_frame_stream, STREAM_CONTENT_TYPE
+from config import Config
 import cv2, json
+import base64
+import binascii
 import io
+import math
+import uuid
+from datetime import timedelta
 
 analysis_bp = Blueprint("analysis", __name__, url_prefix="/api/feeds")
 
+# Result versions restart with the process, so ETags also carry a per-process id
+BOOT_ID = uuid.uuid4().hex[:8]
+
+def load_zones(feed_id):
+    """Put a feed's zones into the zone cache on first use; False if there is no such feed.
+
+    Later edits go through the zone endpoints, which refresh the cache themselves.
+    """
+    if zone_cache.loaded(feed_id):
+        return True
+    if Feed.query.get(feed_id) is None:
+        return False
+    zone_cache.set(feed_id, Zone.query.filter_by(feed_id=feed_id).all())
+    return True
+
 @analysis_bp.route("/<int:feed_id>/start_analysis", methods=["POST"])
 def start(feed_id):
     feed = Feed.query.get(feed_id)
@@ -33,8 +60,21 @@ def start(feed_id):
     else:
         return jsonify({"error": "Invalid feed type"}), 400
 
-    zones, labels = scale_zones(Zone.query.filter_by(feed_id=feed_id).all(), w, h)
-    start_analysis(feed_id, video_source, zones, labels)
+    # Optional pacing: {"mode": "offline"} analyses a file as fast as possible, target_fps caps the rate
+    options = request.get_json(silent=True) or {}
+    mode = options.get("mode", "realtime")
+    if mode not in ("realtime", "offline"):
+        return jsonify({"error": "mode must be realtime or offline"}), 400
+    target_fps = options.get("target_fps")
+    if target_fps is not None:
+        if isinstance(target_fps, bool) or not isinstance(target_fps, (int, float)) or \
+                not math.isfinite(target_fps) or target_fps < 0:
+            return jsonify({"error": "target_fps must be a non-negative number"}), 400
+        target_fps = float(target_fps)
+
+    # Zones come from the zone cache, so edits apply to the running analysis
+    load_zones(feed_id)
+    start_analysis(feed_id, video_source, realtime=mode != "offline", target_fps=target_fps)
     return jsonify({"status": "started"})
 
 @analysis_bp.route("/<int:feed_id>/stop_analysis", methods=["POST"])
@@ -42,13 +82,145 @@ def stop(feed_id):
     stop_analysis(feed_id)
     return jsonify({"status": "stopped"})
 
+def conditional(response, feed_id, version, representation):
+    """Tag a response with the result version; answers 304 if the client already has it."""
+    response.set_etag(f"{feed_id}-{version}-{representation}-{BOOT_ID}")
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
 @analysis_bp.route("/<int:feed_id>/counts")
 def counts(feed_id):
-    return jsonify(get_counts(feed_id))
+    version, counts, _ = get_versioned_result(feed_id)
+    return conditional(jsonify({**counts, "version": version}), feed_id, version, "counts")
 
 @analysis_bp.route("/<int:feed_id>/detections")
 def detections(feed_id):
-    return jsonify(get_detections(feed_id))
+    """Latest detections. ?format=columnar gives parallel arrays, ?format=binary a packed buffer
+    (see postprocess.pack_detections); the default is the list of per-person objects."""
+    version, _, dets = get_versioned_result(feed_id)
+    fmt = request.args.get("format", "list")
+    if fmt == "columnar":
+        response = jsonify({"version": version, **detections_to_columns(dets)})
+    elif fmt == "binary":
+        response = Response(pack_detections(dets, version), mimetype="application/octet-stream")
+    elif fmt == "list":
+        response = jsonify(detections_to_dicts(dets))
+    else:
+        return jsonify({"error": "format must be list, columnar or binary"}), 400
+    response.headers["X-Result-Version"] = str(version)
+    return conditional(response, feed_id, version, f"detections-{fmt}")
+
+@analysis_bp.route("/<int:feed_id>/offline_jobs", methods=["GET", "POST"])
+def feed_offline_jobs(feed_id):
+    if request.method == "GET":
+        prune_offline_jobs()
+        return jsonify([job.status() for job in list(offline_jobs.values()) if job.feed_id == feed_id])
+
+    feed = Feed.query.get(feed_id)
+    if not feed or feed.type != "video" or not feed.video_filename:
+        return jsonify({"error": "Offline analysis needs a video feed with an uploaded file"}), 400
+    video_source = f"static/videos/{feed.video_filename}"
+    info = probe_video(video_source)
+    if info is None:
+        return jsonify({"error": "Cannot open video"}), 400
+
+    options = request.get_json(silent=True) or {}
+    try:
+        stride = int(options.get("stride", 1))
+        batch_size = int(options["batch_size"]) if options.get("batch_size") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "stride and batch_size must be integers"}), 400
+    if stride < 1 or (batch_size is not None and batch_size < 1):
+        return jsonify({"error": "stride and batch_size must be at least 1"}), 400
+    load_zones(feed_id)
+    zone_index = feed_zone_index(feed_id, info[0], info[1])
+    job = start_offline_job(feed_id, video_source, [p.tolist() for p in zone_index.polygons], zone_index.labels,
+                            stride=stride, batch_size=batch_size)
+    return jsonify({"status": "started", "job": job.status()}), 202
+
+@analysis_bp.route("/offline_jobs/<job_id>", methods=["GET", "DELETE"])
+def offline_job(job_id):
+    prune_offline_jobs()
+    job = offline_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    if request.method == "DELETE":
+        job.cancelled = True
+        return jsonify({"status": "cancelling"})
+    if request.args.get("format") == "csv" and job.result is not None:
+        out = io.StringIO()
+        write_csv(job.result, out)
+        return Response(out.getvalue(), mimetype="text/csv",
+                        headers={"Content-Disposition": f"attachment; filename=offline_{job_id}.csv"})
+    return jsonify(job.status(include_result=True))
+
+@analysis_bp.route("/<int:feed_id>/stats")
+def stats(feed_id):
+    return jsonify(get_stats(feed_id))
+
+@analysis_bp.route("/<int:feed_id>/trace")
+def trace(feed_id):
+    """Recent frame spans of a feed in Chrome trace-event format (chrome://tracing, Perfetto)."""
+    if feed_id not in span_buffers:
+        return jsonify({"error": "No trace recorded for this feed"}), 404
+    return Response(json.dumps(span_buffers[feed_id].chrome_trace(feed_id)), mimetype="application/json",
+                    headers={"Content-Disposition": f"attachment; filename=feed-{feed_id}-trace.json"})
+
+@analysis_bp.route("/<int:feed_id>/logging", methods=["GET", "POST"])
+def logging_settings(feed_id):
+    """Per-feed log level, frame sampling and rate limit, e.g. {"level": "debug", "sample_every": 1, "rate": 50}"""
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        try:
+            return jsonify(configure_feed_log(feed_id, data.get("level"), data.get("sample_every"), data.get("rate")))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify(feed_log(feed_id).settings())
+
+@analysis_bp.route("/<int:feed_id>/history")
+def history(feed_id):
+    """Count history between ?start and ?end (ISO 8601, UTC unless an offset is given; default the last hour).
+
+    ?resolution is raw, minute, hour or auto (default), ?zone limits it to one zone.
+    """
+    try:
+        end = parse_utc(request.args["end"]) if "end" in request.args else utcnow()
+        start = parse_utc(request.args["start"]) if "start" in request.args else end - timedelta(hours=1)
+    except ValueError:
+        return jsonify({"error": "start/end must be ISO 8601 timestamps"}), 400
+    resolution = request.args.get("resolution", "auto")
+    if resolution not in ("auto", "raw", "minute", "hour"):
+        return jsonify({"error": "Invalid resolution"}), 400
+    result = query_history(feed_id, start, end, resolution, request.args.get("zone"))
+    return jsonify({"start": start.isoformat(), "end": end.isoformat(), **result})
+
+def event_stream(feed_ids):
+    try:
+        min_interval = float(request.args.get("interval", 0))
+        if not math.isfinite(min_interval):
+            raise ValueError(min_interval)
+    except ValueError:
+        return jsonify({"error": "interval must be a number of seconds"}), 400
+    min_interval = max(0.0, min_interval)
+    events = generate_events(feed_ids, request.headers.get("Last-Event-ID"), min_interval=min_interval)
+    return Response(events, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@analysis_bp.route("/<int:feed_id>/events")
+def events(feed_id):
+    """Live count/detection updates for one feed as Server-Sent Events (?interval= throttles)."""
+    return event_stream([feed_id])
+
+@analysis_bp.route("/events")
+def multiplexed_events():
+    """Live updates for several feeds on one connection: /api/feeds/events?ids=1,2,3"""
+    try:
+        feed_ids = [int(i) for i in request.args.get("ids", "").split(",") if i]
+    except ValueError:
+        return jsonify({"error": "ids must be a comma separated list of feed ids"}), 400
+    if not feed_ids:
+        return jsonify({"error": "No feed ids given"}), 400
+    return event_stream(feed_ids)
 
 @analysis_bp.route("/<int:feed_id>/report")
 @login_required
@@ -59,8 +231,10 @@ def report(feed_id):
 
     counts = get_counts(feed_id)
     detections = get_detections(feed_id)
+    history = summarize_history(feed_id, hours=24)
 
-    return render_template("analysis_report.html", feed=feed, counts=counts, detections=detections)
+    return render_template("analysis_report.html", feed=feed, counts=counts, detections=detections,
+                           history=history, total_zone=TOTAL_ZONE)
 
 # @analysis_bp.route("/<int:feed_id>/download_report")
 # @login_required
@@ -87,39 +261,127 @@ def toggle_deepsort_endpoint(feed_id):
     toggle_deepsort(feed_id, enabled)
     return jsonify({"status": "success"})
 
+@analysis_bp.route("/<int:feed_id>/tracker", methods=["GET", "POST"])
+def tracker(feed_id):
+    """Tracker of a feed: {"tracker": "bytetrack" | "deepsort" | null}"""
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        try:
+            set_tracker(feed_id, data.get("tracker"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify(get_tracker(feed_id))
+
+@analysis_bp.route("/<int:feed_id>/motion_gate", methods=["GET", "POST"])
+def motion_gate(feed_id):
+    """Skip the detector while nothing moves: {"enabled": true, "zones_only": false}"""
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        set_motion_gate(feed_id, data.get("enabled", False), data.get("zones_only", False))
+    return jsonify(get_motion_gate(feed_id))
+
+@analysis_bp.route("/<int:feed_id>/keyframes", methods=["GET", "POST"])
+def keyframes(feed_id):
+    """Detector interval while tracking: {"interval": 4, "adaptive": true, "max_interval": 10}"""
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        try:
+            set_keyframes(feed_id, data.get("interval", 1), data.get("adaptive", True), data.get("max_interval"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "interval and max_interval must be integers"}), 400
+    return jsonify(get_keyframes(feed_id))
+
+@analysis_bp.route("/<int:feed_id>/inference_plan", methods=["GET", "POST"])
+def inference_plan(feed_id):
+    """How frames go to the detector: {"mode": "full" | "roi" | "tiles" | "auto"}"""
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        try:
+            set_inference_plan(feed_id, data.get("mode"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify(get_inference_plan(feed_id))
+
+@analysis_bp.route("/<int:feed_id>/inference_settings", methods=["GET", "POST"])
+def inference_settings(feed_id):
+    """Model variant, input size, confidence, max detections and latency auto-tuning:
+    {"model": str, "imgsz": int, "conf": float, "max_det": int, "auto_tune": bool, "latency_budget_ms": float}
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        try:
+            set_inference_settings(feed_id, **data)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify(get_inference_settings(feed_id))
+
 @analysis_bp.route("/<int:feed_id>/stream")
 def stream(feed_id):
     return Response(generate_frames(feed_id), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @analysis_bp.route("/<int:feed_id>/process_frame", methods=["POST"])
 def process_feed_frame(feed_id):
-    feed = Feed.query.get(feed_id)
-    if not feed:
+    """One base64 frame in a JSON body: {"image": "<base64 or data URL>"}. Prefer /frames, which takes raw bytes."""
+    if not load_zones(feed_id):
         return jsonify({"error": "Invalid feed"}), 400
 
-    data = request.get_json()
+    data = request.get_json(silent=True)
     if not data or 'image' not in data:
         return jsonify({"error": "No image provided"}), 400
+    try:
+        image = base64.b64decode(str(data['image']).split(",")[-1], validate=True)
+    except (binascii.Error, ValueError):
+        return jsonify({"error": "Invalid base64 image"}), 400
+
+    ingestor = FrameIngestor(feed_id, lambda w, h: feed_zone_index(feed_id, w, h), with_detections=True)
+    result = (ingestor.add(image) + ingestor.finish())[0]
+    if "error" in result:
+        return jsonify({"error": result["error"]}), 400
+    return jsonify({"counts": result["zones"], "total": result["total"], "detections": result["detections"]})
+
+@analysis_bp.route("/<int:feed_id>/frames", methods=["POST"])
+def ingest_frames(feed_id):
+    """Frames pushed by a client camera; returns people counts per frame, in order.
+
+    * ``image/jpeg`` (or any image type): one frame, capture time (Unix seconds) in ``X-Frame-Timestamp``
+    * ``multipart/form-data``: ``frame`` file parts, with optional ``timestamp`` fields in the same order
+    * ``application/x-frame-stream``: length-prefixed frames (see ingestion.py), analysed while they arrive;
+      the response is NDJSON, one result line per frame, sent while later frames are still arriving
+
+    ``?detections=1`` adds each frame's boxes.
+    """
+    # Zones are compiled once per frame size and shared with every request
+    if not load_zones(feed_id):
+        return jsonify({"error": "Invalid feed"}), 400
+    ingestor = FrameIngestor(feed_id, lambda w, h: feed_zone_index(feed_id, w, h), Config.INGEST_MAX_IN_FLIGHT,
+                             with_detections=request.args.get("detections") == "1")
+    if request.mimetype == STREAM_CONTENT_TYPE:
+        return Response(stream_with_context(stream_frame_results(ingestor)), mimetype="application/x-ndjson")
+    results = []
+    try:
+        if request.mimetype.startswith("image/"):
+            timestamp = request.headers.get("X-Frame-Timestamp")
+            results += ingestor.add(request.get_data(), float(timestamp) if timestamp else None)
+        elif request.mimetype == "multipart/form-data":
+            timestamps = request.form.getlist("timestamp")
+            for i, part in enumerate(request.files.getlist("frame")):
+                results += ingestor.add(part.read(), float(timestamps[i]) if i < len(timestamps) else None)
+        else:
+            return jsonify({"error": f"Unsupported content type: {request.mimetype}"}), 415
+    except ValueError as e:
+        return jsonify({"error": str(e), "frames": results + ingestor.finish()}), 400
+    return jsonify({"frames": results + ingestor.finish()})
 
-    image_data = data['image']
-
-    # Get zones, scale to frame size
-    zones_db = Zone.query.filter_by(feed_id=feed_id).all()
-    # For camera, assume frame size is sent or default, but since we don't know, assume zones are in pixel coords as is.
-    # For simplicity, assume zones are defined for the camera resolution, or scale if needed.
-    # For now, use zones as is, assuming they match.
-
-    zones, labels = [], []
-    for z in zones_db:
-        coords = json.loads(z.coordinates)
-        # coords is dict with topleft etc.
-        # Convert to (x1,y1,x2,y2)
-        x1 = min(coords['topleft'][0], coords['bottomleft'][0])
-        y1 = min(coords['topleft'][1], coords['topright'][1])
-        x2 = max(coords['bottomright'][0], coords['topright'][0])
-        y2 = max(coords['bottomright'][1], coords['bottomleft'][1])
-        zones.append((x1, y1, x2, y2))
-        labels.append(z.label)
-
-    # counts, detections = process_frame(image_data, zones, labels)
-    return jsonify({"counts": counts, "detections": detections})
+def stream_frame_results(ingestor):
+    """NDJSON lines of a frame stream's results while it is read; a malformed stream ends with an error line."""
+    try:
+        for timestamp, data in iter_frame_stream(request.stream, Config.INGEST_MAX_FRAME_BYTES):
+            for result in ingestor.add(data, timestamp):
+                yield json.dumps(result) + "\n"
+    except ValueError as e:
+        for result in ingestor.finish():
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"error": str(e)}) + "\n"
+        return
+    for result in ingestor.finish():
+        yield json.dumps(result) + "\n"
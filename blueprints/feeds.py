@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from models import db, Feed, Zone
 from helpers import serialize_feed, serialize_zone, login_required
+from zone_cache import zone_cache
 import os, uuid, json
 from flask import current_app as app
 
@@ -61,6 +62,8 @@ def zones(feed_id):
     for zone_data in data.get("zones", []):
         db.session.add(Zone(feed_id=feed_id, label=zone_data["label"], coordinates=json.dumps(zone_data["coordinates"])))
     db.session.commit()
+    # Running analyses pick up the new zones on their next frame
+    zone_cache.set(feed_id, Zone.query.filter_by(feed_id=feed_id).all())
     return jsonify({"status": "success"})
 
 
@@ -72,6 +75,7 @@ def delete_zone(feed_id, zone_id):
         return jsonify({"error": "Zone not found"}), 404
     db.session.delete(zone)
     db.session.commit()
+    zone_cache.set(feed_id, Zone.query.filter_by(feed_id=feed_id).all())
     return jsonify({"status": "success"})
 
 @feeds_bp.route("/<int:feed_id>", methods=["DELETE"])
@@ -84,4 +88,5 @@ def delete_feed(feed_id):
     Zone.query.filter_by(feed_id=feed_id).delete()
     db.session.delete(feed)
     db.session.commit()
+    zone_cache.forget(feed_id)
     return jsonify({"status": "success"})
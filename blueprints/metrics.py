@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from metrics import REGISTRY
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
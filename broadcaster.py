@@ -0,0 +1,87 @@
+import threading
+
+
+class FrameBroadcaster:
+    """Single-slot, versioned fan-out of encoded frames for one feed.
+
+    The analysis loop ``publish()``es each JPEG once; every stream client blocks
+    in ``wait()`` until the version moves past the last one it sent. Publishing
+    never waits for clients, so a slow client simply skips the versions it
+    missed instead of stalling the loop or the other viewers.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.frame = None
+        self.version = 0
+        self.closed = False
+        self.subscribers = 0
+
+    def publish(self, frame):
+        with self._cond:
+            self.frame = frame
+            self.version += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def wait(self, last_version, timeout=None):
+        """Return ``(version, frame)`` newer than ``last_version``, or None on timeout/close."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > last_version or self.closed, timeout)
+            if self.closed or self.version <= last_version:
+                return None
+            return self.version, self.frame
+
+    def subscribe(self, timeout=1.0):
+        """Yield each new frame until the broadcaster is closed."""
+        with self._cond:
+            self.subscribers += 1
+        try:
+            last_version = 0
+            while not self.closed:
+                update = self.wait(last_version, timeout)
+                if update is not None:
+                    last_version, frame = update
+                    yield frame
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+
+class ResultNotifier:
+    """Latest analysis result per feed with a version counter, shared by all feeds.
+
+    One condition covers every feed, so a single waiter can follow several
+    feeds at once and is woken only when one of them publishes a new result.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._latest = {}  # feed_id -> (version, payload)
+
+    def publish(self, feed_id, payload):
+        with self._cond:
+            version = self._latest.get(feed_id, (0, None))[0] + 1
+            self._latest[feed_id] = (version, payload)
+            self._cond.notify_all()
+            return version
+
+    def latest(self, feed_id):
+        """Return ``(version, payload)`` for a feed, ``(0, None)`` before its first result."""
+        return self._latest.get(feed_id, (0, None))
+
+    def wait(self, versions, timeout=None):
+        """Block until a feed in ``versions`` ({feed_id: last seen version}) has a newer result.
+
+        Returns the list of changed feed ids (empty on timeout).
+        """
+        def changed():
+            return [feed_id for feed_id, seen in versions.items() if self.latest(feed_id)[0] != seen]
+
+        with self._cond:
+            self._cond.wait_for(changed, timeout)
+            return changed()
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+# decode_seconds is how long the capture thread spent decoding the frame
+CapturedFrame = namedtuple("CapturedFrame", ["frame", "index", "timestamp", "decode_seconds"], defaults=(0.0,))
+
+
+class FrameGrabber:
+    """Reads a video source on its own thread and holds only the newest frame.
+
+    For live sources (camera indices) the capture thread never waits for the
+    consumer: a frame that was not picked up before the next one arrives is
+    overwritten and counted in ``dropped``, so ``read()`` always returns the
+    freshest frame and latency is bounded by one processing iteration. For
+    files (``live=False``) the thread waits until the consumer has taken the
+    current frame, so no frames are lost unless the consumer asks to skip ahead
+    with ``read(min_index=...)``; skipped frames are grabbed without decoding.
+    """
+
+    def __init__(self, source, live=None):
+        self.source = source
+        self.live = isinstance(source, int) if live is None else live
+        self.cap = cv2.VideoCapture(source)
+        if self.live:
+            # Keep the driver-side queue as short as the backend allows
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._index = -1
+        self._timestamp = 0.0
+        self._decode_seconds = 0.0
+        self._taken = True
+        self._thread = None
+        self.ended = False
+        self.stopped = False
+        self._min_index = 0
+        self.frames_read = 0
+        self.dropped = 0
+        self.skipped = 0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"capture-{self.source}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        position = 0  # index of the next frame the decoder will produce
+        while not self.stopped:
+            if not self.live and position < self._min_index:
+                # Behind the consumer's playback clock: advance without decoding
+                if not self.cap.grab():
+                    with self._cond:
+                        self.ended = True
+                        self._cond.notify_all()
+                    break
+                position += 1
+                with self._cond:
+                    self.skipped += 1
+                continue
+
+            decode_start = time.perf_counter()
+            ret, frame = self.cap.read()
+            decode_seconds = time.perf_counter() - decode_start
+            timestamp = time.monotonic()
+            with self._cond:
+                if not ret:
+                    self.ended = True
+                    self._cond.notify_all()
+                    break
+                if not self.live:
+                    self._cond.wait_for(lambda: self._taken or self.stopped)
+                elif not self._taken:
+                    self.dropped += 1
+                self.frames_read += 1
+                self._frame, self._index, self._timestamp = frame, position, timestamp
+                self._decode_seconds = decode_seconds
+                self._taken = False
+                self._cond.notify_all()
+            position += 1
+        self.cap.release()
+
+    def read(self, timeout=None, min_index=0):
+        """Return the newest unseen CapturedFrame, or None on timeout, end of stream or stop.
+
+        Frames with an index below ``min_index`` are discarded and counted as skipped.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._min_index = max(self._min_index, min_index)
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                self._cond.wait_for(lambda: not self._taken or self.ended or self.stopped, remaining)
+                if self._taken:
+                    return None
+                self._taken = True
+                self._cond.notify_all()
+                if self._index >= self._min_index:
+                    return CapturedFrame(self._frame, self._index, self._timestamp, self._decode_seconds)
+                self.skipped += 1
+
+    def stop(self):
+        with self._cond:
+            self.stopped = True
+            self._cond.notify_all()
+        if self._thread is None:
+            self.cap.release()
+        elif self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
@@ -7,3 +7,131 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key')  # Change this to something secret!
     # SECRET_KEY = 'your-secret-key'  # Change this to something secret!
+
+    # Cross-feed batched inference: frames from all running feeds are grouped into
+    # one model call of at most INFERENCE_MAX_BATCH_SIZE frames, waiting at most
+    # INFERENCE_MAX_WAIT_MS for the batch to fill.
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 8))
+    INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 10))
+
+    # Minimum detector confidence for a box to be counted as a person
+    PERSON_CONF_THRESHOLD = float(os.environ.get('PERSON_CONF_THRESHOLD', 0.25))
+
+    # Analysis frame rate cap per feed (0 = as fast as the source delivers). Video
+    # files skip frames to stay in sync with their native frame rate.
+    ANALYSIS_TARGET_FPS = float(os.environ.get('ANALYSIS_TARGET_FPS', 15))
+
+    # MJPEG stream output. Frames are only annotated and encoded while a feed has
+    # viewers; wider frames are downscaled to STREAM_MAX_WIDTH (0 = native size).
+    STREAM_MAX_WIDTH = int(os.environ.get('STREAM_MAX_WIDTH', 960))
+    STREAM_JPEG_QUALITY = int(os.environ.get('STREAM_JPEG_QUALITY', 80))
+
+    # YOLO weights; loaded in the background after startup, see model_registry.py
+    YOLO_MODEL = os.environ.get('YOLO_MODEL', 'yolov8n.pt')
+    MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', '1') == '1'
+
+    # Where inference runs: "thread" (inside the web process) or "process" (a pool
+    # of INFERENCE_WORKERS processes fed through shared-memory frame slots of
+    # INFERENCE_SHM_SLOT_BYTES each; larger frames are sent inline).
+    INFERENCE_MODE = os.environ.get('INFERENCE_MODE', 'thread')
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 2))
+    INFERENCE_SHM_SLOT_BYTES = int(os.environ.get('INFERENCE_SHM_SLOT_BYTES', 1920 * 1080 * 3))
+
+    # Count history: at most one sample per feed every COUNT_HISTORY_SAMPLE_INTERVAL
+    # seconds, written to the database in bulk every COUNT_HISTORY_FLUSH_INTERVAL
+    # seconds. Raw samples are purged after COUNT_HISTORY_RAW_RETENTION_DAYS;
+    # minute/hour rollups are kept.
+    COUNT_HISTORY_SAMPLE_INTERVAL = float(os.environ.get('COUNT_HISTORY_SAMPLE_INTERVAL', 1.0))
+    COUNT_HISTORY_FLUSH_INTERVAL = float(os.environ.get('COUNT_HISTORY_FLUSH_INTERVAL', 5.0))
+    COUNT_HISTORY_RAW_RETENTION_DAYS = int(os.environ.get('COUNT_HISTORY_RAW_RETENTION_DAYS', 7))
+
+    # Raw detections of analysed video files are cached on disk, keyed by file
+    # content, model and inference settings, so re-running a file (e.g. after
+    # editing zones) skips inference. Least recently used entries are evicted
+    # beyond DETECTION_CACHE_MAX_MB.
+    DETECTION_CACHE_ENABLED = os.environ.get('DETECTION_CACHE_ENABLED', '1') == '1'
+    DETECTION_CACHE_DIR = os.environ.get('DETECTION_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'detections'))
+    DETECTION_CACHE_MAX_MB = int(os.environ.get('DETECTION_CACHE_MAX_MB', 1024))
+
+    # Finished offline jobs (with their count series) are kept for OFFLINE_JOB_TTL
+    # seconds, and only the OFFLINE_JOB_MAX_FINISHED most recent ones
+    OFFLINE_JOB_TTL = float(os.environ.get('OFFLINE_JOB_TTL', 3600))
+    OFFLINE_JOB_MAX_FINISHED = int(os.environ.get('OFFLINE_JOB_MAX_FINISHED', 20))
+
+    # Pipeline logging goes through a background queue. Per-frame messages are
+    # DEBUG, sampled every FEED_LOG_SAMPLE_EVERY frames and limited to
+    # FEED_LOG_RATE messages/s per feed; the level can be raised for a single
+    # feed through /api/feeds/<id>/logging. The last TRACE_BUFFER_FRAMES frames
+    # of each feed are kept as spans for /api/feeds/<id>/trace.
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    FEED_LOG_SAMPLE_EVERY = int(os.environ.get('FEED_LOG_SAMPLE_EVERY', 30))
+    FEED_LOG_RATE = float(os.environ.get('FEED_LOG_RATE', 5))
+    TRACE_BUFFER_FRAMES = int(os.environ.get('TRACE_BUFFER_FRAMES', 600))
+
+    # Motion gate (per feed, see /api/feeds/<id>/motion_gate): the detector is
+    # skipped while less than MOTION_GATE_MIN_CHANGED of the (zone) pixels
+    # differ by more than MOTION_GATE_PIXEL_THRESHOLD grey levels from the last
+    # detected frame, but it still runs at least every MOTION_GATE_MAX_SKIP frames.
+    MOTION_GATE_ENABLED = os.environ.get('MOTION_GATE_ENABLED', '0') == '1'
+    MOTION_GATE_PIXEL_THRESHOLD = int(os.environ.get('MOTION_GATE_PIXEL_THRESHOLD', 25))
+    MOTION_GATE_MIN_CHANGED = float(os.environ.get('MOTION_GATE_MIN_CHANGED', 0.002))
+    MOTION_GATE_MAX_SKIP = int(os.environ.get('MOTION_GATE_MAX_SKIP', 15))
+
+    # Keyframes (per feed, see /api/feeds/<id>/keyframes): with tracking on, the
+    # detector runs every KEYFRAME_INTERVAL frames (1 = every frame) and the
+    # tracker predicts the frames in between. KEYFRAME_ADAPTIVE lets the interval
+    # move between 1 and KEYFRAME_MAX_INTERVAL so that people move at most
+    # KEYFRAME_MAX_SHIFT of their height between keyframes.
+    KEYFRAME_INTERVAL = int(os.environ.get('KEYFRAME_INTERVAL', 1))
+    KEYFRAME_ADAPTIVE = os.environ.get('KEYFRAME_ADAPTIVE', '1') == '1'
+    KEYFRAME_MAX_INTERVAL = int(os.environ.get('KEYFRAME_MAX_INTERVAL', 10))
+    KEYFRAME_MAX_SHIFT = float(os.environ.get('KEYFRAME_MAX_SHIFT', 0.25))
+
+    # Inference planning (per feed, see /api/feeds/<id>/inference_plan): "full"
+    # frames, a "roi" crop around the zones, overlapping "tiles" for large
+    # frames, or "auto". INFERENCE_IMGSZ is the model input size. Every
+    # PLAN_AUDIT_EVERY frames a full-frame call checks the plan's recall.
+    INFERENCE_PLAN = os.environ.get('INFERENCE_PLAN', 'full')
+    INFERENCE_IMGSZ = int(os.environ.get('INFERENCE_IMGSZ', 640))
+    TILE_SIZE = int(os.environ.get('TILE_SIZE', 1280))
+    TILE_OVERLAP = float(os.environ.get('TILE_OVERLAP', 0.2))
+    TILE_MIN_SIDE = int(os.environ.get('TILE_MIN_SIDE', 2560))
+    ROI_MAX_FRACTION = float(os.environ.get('ROI_MAX_FRACTION', 0.5))
+    PLAN_AUDIT_EVERY = int(os.environ.get('PLAN_AUDIT_EVERY', 300))
+
+    # Per-feed inference settings (see /api/feeds/<id>/inference_settings). With
+    # auto-tuning a feed moves along INFERENCE_IMGSZ_LADDER to keep the 90th
+    # percentile of its detector latency (queueing included) under
+    # INFERENCE_LATENCY_BUDGET_MS, measured over INFERENCE_TUNE_WINDOW calls; with
+    # headroom at the top size it moves on to the larger variants listed after
+    # its model in INFERENCE_MODEL_LADDER (e.g. "yolov8n.pt,yolov8s.pt,yolov8m.pt").
+    INFERENCE_AUTO_TUNE = os.environ.get('INFERENCE_AUTO_TUNE', '0') == '1'
+    INFERENCE_LATENCY_BUDGET_MS = float(os.environ.get('INFERENCE_LATENCY_BUDGET_MS', 100))
+    INFERENCE_IMGSZ_LADDER = [int(s) for s in os.environ.get('INFERENCE_IMGSZ_LADDER', '320,416,512,640,800,960').split(',')]
+    INFERENCE_MODEL_LADDER = [m.strip() for m in os.environ.get('INFERENCE_MODEL_LADDER', YOLO_MODEL).split(',')]
+    INFERENCE_TUNE_WINDOW = int(os.environ.get('INFERENCE_TUNE_WINDOW', 20))
+
+    # Tracker used when tracking is switched on: "deepsort" (appearance
+    # embeddings, falls back to "bytetrack" when deep_sort_realtime is not
+    # installed) or "bytetrack" (motion only, much cheaper on CPU). Can be
+    # chosen per feed through /api/feeds/<id>/tracker.
+    TRACKER = os.environ.get('TRACKER', 'deepsort')
+
+    # DeepSort appearance embeddings: crops of all feeds are embedded in shared
+    # batches of at most EMBED_MAX_BATCH_SIZE (waiting EMBED_MAX_WAIT_MS), and
+    # a person whose box still overlaps the box of its last embedding by
+    # EMBED_REUSE_IOU keeps that embedding for up to EMBED_MAX_REUSE frames.
+    # EMBEDDING_BATCHED=0 lets DeepSort embed every crop itself.
+    EMBEDDING_BATCHED = os.environ.get('EMBEDDING_BATCHED', '1') == '1'
+    EMBED_MAX_BATCH_SIZE = int(os.environ.get('EMBED_MAX_BATCH_SIZE', 64))
+    EMBED_MAX_WAIT_MS = float(os.environ.get('EMBED_MAX_WAIT_MS', 5))
+    EMBED_REUSE_IOU = float(os.environ.get('EMBED_REUSE_IOU', 0.9))
+    EMBED_MAX_REUSE = int(os.environ.get('EMBED_MAX_REUSE', 30))
+    EMBED_CACHE_SIZE = int(os.environ.get('EMBED_CACHE_SIZE', 256))
+    EMBEDDER_GPU = os.environ.get('EMBEDDER_GPU', '1') == '1'
+
+    # Frame ingestion (POST /api/feeds/<id>/frames): at most INGEST_MAX_IN_FLIGHT
+    # frames of a request wait on the inference scheduler at a time, and
+    # streamed frames may be at most INGEST_MAX_FRAME_BYTES each.
+    INGEST_MAX_IN_FLIGHT = int(os.environ.get('INGEST_MAX_IN_FLIGHT', 8))
+    INGEST_MAX_FRAME_BYTES = int(os.environ.get('INGEST_MAX_FRAME_BYTES', 8 * 1024 * 1024))
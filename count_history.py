@@ -0,0 +1,202 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, ZoneCount, ZoneCountRollup
+from tracing import logger
+
+# Zone name under which the whole-frame total is stored
+TOTAL_ZONE = "__total__"
+
+ROLLUP_RESOLUTIONS = {
+    "minute": lambda ts: ts.replace(second=0, microsecond=0),
+    "hour": lambda ts: ts.replace(minute=0, second=0, microsecond=0),
+}
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_utc(value):
+    """ISO 8601 timestamp as the naive UTC datetime history is stored in; offsets are converted."""
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+class CountHistoryWriter:
+    """Write-behind buffer for per-zone count samples.
+
+    Analysis loops call ``record()``, which only appends to an in-memory buffer
+    (at most one sample per feed every ``sample_interval`` seconds). A
+    background thread flushes the buffer every ``flush_interval`` seconds, or
+    sooner once ``max_buffer`` rows are waiting, as one transaction that bulk
+    inserts the raw samples and merges them into the per-minute and per-hour
+    rollups. Raw samples older than ``raw_retention_days`` are purged; rollups
+    are kept.
+    """
+
+    def __init__(self, sample_interval=1.0, flush_interval=5.0, max_buffer=2000, raw_retention_days=7):
+        self.sample_interval = sample_interval
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.raw_retention_days = raw_retention_days
+        self.app = None
+        self._buffer = []
+        self._last_sample = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_purge = 0.0
+        self.rows_written = 0
+        self.flushes = 0
+
+    def init_app(self, app):
+        self.sample_interval = app.config.get("COUNT_HISTORY_SAMPLE_INTERVAL", self.sample_interval)
+        self.flush_interval = app.config.get("COUNT_HISTORY_FLUSH_INTERVAL", self.flush_interval)
+        self.raw_retention_days = app.config.get("COUNT_HISTORY_RAW_RETENTION_DAYS", self.raw_retention_days)
+        self.app = app
+        threading.Thread(target=self._run, name="count-history", daemon=True).start()
+
+    def record(self, feed_id, counts, timestamp=None):
+        """Buffer one ``{"total": n, "zones": {label: n}}`` snapshot for a feed."""
+        if self.app is None:
+            return
+        now = time.monotonic()
+        if now - self._last_sample.get(feed_id, float("-inf")) < self.sample_interval:
+            return
+        self._last_sample[feed_id] = now
+        timestamp = timestamp or utcnow()
+        rows = [{"feed_id": feed_id, "zone": TOTAL_ZONE, "timestamp": timestamp, "count": int(counts["total"])}]
+        rows.extend({"feed_id": feed_id, "zone": zone, "timestamp": timestamp, "count": int(count)}
+                    for zone, count in counts["zones"].items())
+        with self._lock:
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                logger.error("Count history flush failed: %s", e)
+
+    def flush(self):
+        """Write all buffered samples and their rollups in one transaction (needs an app context)."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+
+        # Aggregate the batch per rollup bucket before touching the database
+        buckets = {}
+        for row in rows:
+            for resolution, truncate in ROLLUP_RESOLUTIONS.items():
+                key = (row["feed_id"], row["zone"], resolution, truncate(row["timestamp"]))
+                agg = buckets.get(key)
+                if agg is None:
+                    buckets[key] = [1, row["count"], row["count"], row["count"]]
+                else:
+                    agg[0] += 1
+                    agg[1] += row["count"]
+                    agg[2] = min(agg[2], row["count"])
+                    agg[3] = max(agg[3], row["count"])
+
+        rollups = [{"feed_id": feed_id, "zone": zone, "resolution": resolution, "bucket_start": bucket_start,
+                    "samples": samples, "count_sum": total, "count_min": low, "count_max": high}
+                   for (feed_id, zone, resolution, bucket_start), (samples, total, low, high) in buckets.items()]
+        upsert = sqlite_insert(ZoneCountRollup)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=["feed_id", "zone", "resolution", "bucket_start"],
+            set_={
+                "samples": ZoneCountRollup.samples + upsert.excluded.samples,
+                "count_sum": ZoneCountRollup.count_sum + upsert.excluded.count_sum,
+                "count_min": func.min(ZoneCountRollup.count_min, upsert.excluded.count_min),
+                "count_max": func.max(ZoneCountRollup.count_max, upsert.excluded.count_max),
+            },
+        )
+
+        try:
+            db.session.execute(insert(ZoneCount), rows)
+            db.session.execute(upsert, rollups)
+            if time.monotonic() - self._last_purge > 3600:
+                cutoff = utcnow() - timedelta(days=self.raw_retention_days)
+                ZoneCount.query.filter(ZoneCount.timestamp < cutoff).delete(synchronize_session=False)
+                self._last_purge = time.monotonic()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self.rows_written += len(rows)
+        self.flushes += 1
+        return len(rows)
+
+
+def pick_resolution(start, end):
+    """Coarsest resolution that still gives a useful number of points for the range."""
+    span = end - start
+    if span > timedelta(days=2):
+        return "hour"
+    if span > timedelta(hours=1):
+        return "minute"
+    return "raw"
+
+
+def query_history(feed_id, start, end, resolution="auto", zone=None):
+    """Count series for a feed between ``start`` and ``end`` (naive UTC datetimes).
+
+    Returns ``{zone: [{"time", "avg", "min", "max"}, ...]}``; raw samples have
+    avg == min == max.
+    """
+    if resolution == "auto":
+        resolution = pick_resolution(start, end)
+
+    series = {}
+    if resolution == "raw":
+        query = ZoneCount.query.filter(ZoneCount.feed_id == feed_id,
+                                       ZoneCount.timestamp >= start, ZoneCount.timestamp <= end)
+        if zone is not None:
+            query = query.filter(ZoneCount.zone == zone)
+        for row in query.order_by(ZoneCount.timestamp):
+            series.setdefault(row.zone, []).append(
+                {"time": row.timestamp.isoformat(), "avg": row.count, "min": row.count, "max": row.count})
+    else:
+        query = ZoneCountRollup.query.filter(ZoneCountRollup.feed_id == feed_id,
+                                             ZoneCountRollup.resolution == resolution,
+                                             ZoneCountRollup.bucket_start >= start,
+                                             ZoneCountRollup.bucket_start <= end)
+        if zone is not None:
+            query = query.filter(ZoneCountRollup.zone == zone)
+        for row in query.order_by(ZoneCountRollup.bucket_start):
+            series.setdefault(row.zone, []).append({
+                "time": row.bucket_start.isoformat(),
+                "avg": round(row.count_sum / row.samples, 2) if row.samples else 0,
+                "min": row.count_min,
+                "max": row.count_max,
+            })
+    return {"resolution": resolution, "series": series}
+
+
+def summarize_history(feed_id, hours=24):
+    """Average and peak count per zone over the last ``hours`` from the hourly rollups."""
+    start = utcnow() - timedelta(hours=hours)
+    rows = (db.session.query(ZoneCountRollup.zone,
+                             func.sum(ZoneCountRollup.count_sum), func.sum(ZoneCountRollup.samples),
+                             func.max(ZoneCountRollup.count_max))
+            .filter(ZoneCountRollup.feed_id == feed_id, ZoneCountRollup.resolution == "hour",
+                    ZoneCountRollup.bucket_start >= ROLLUP_RESOLUTIONS["hour"](start))
+            .group_by(ZoneCountRollup.zone).all())
+    return {zone: {"avg": round(total / samples, 2) if samples else 0, "peak": peak}
+            for zone, total, samples, peak in rows}
+
+
+count_history = CountHistoryWriter()
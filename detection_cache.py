@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from postprocess import Detections, empty_detections
+
+
+# Content hashes by (path, size, mtime), so unchanged files are only read once
+content_hashes = {}
+
+
+def video_content_hash(path):
+    """SHA-256 of a file's contents."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = content_hashes.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = content_hashes[memo_key] = h.hexdigest()
+    return digest
+
+
+class CachedDetections:
+    """Read-only, memory-mapped detections of one video for one model/settings key.
+
+    ``offsets[i]:offsets[i + 1]`` selects frame ``i``'s rows of ``dets``
+    (x1, y1, x2, y2, conf, cls as float32); ``present[i]`` says whether frame
+    ``i`` was analysed at all.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.present = np.load(os.path.join(path, "present.npy"), mmap_mode="r")
+        self.dets = np.load(os.path.join(path, "dets.npy"), mmap_mode="r")
+
+    @property
+    def frame_count(self):
+        return len(self.present)
+
+    def has(self, index):
+        return 0 <= index < len(self.present) and bool(self.present[index])
+
+    def get(self, index):
+        """Detections of frame ``index``, or None if that frame is not cached."""
+        if not self.has(index):
+            return None
+        rows = np.asarray(self.dets[self.offsets[index]:self.offsets[index + 1]])
+        if not len(rows):
+            return empty_detections()
+        return Detections(rows[:, :4].copy(), rows[:, 4].copy(), rows[:, 5].astype(np.int32))
+
+    def covers(self, indices):
+        return all(self.has(i) for i in indices)
+
+
+class CacheWriter:
+    """Collects detections during a run and merges them into the cache on ``commit()``."""
+
+    def __init__(self, cache, key, frame_count):
+        self.cache = cache
+        self.key = key
+        self.frame_count = frame_count
+        self.frames = {}
+
+    def add(self, index, dets):
+        if 0 <= index < self.frame_count:
+            self.frames[index] = dets
+
+    def commit(self):
+        if self.frames:
+            self.cache._merge(self.key, self.frame_count, self.frames)
+            self.frames = {}
+
+
+class DetectionCache:
+    """On-disk cache of raw detector output, keyed by video content, model and inference settings.
+
+    Each entry is a directory of ``.npy`` arrays that is memory-mapped on read.
+    Entries are replaced by directory renames when new frames are merged in
+    (never left partially written), and the least recently used ones are
+    evicted once the cache exceeds ``max_bytes``.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def key(self, video_path, model, settings):
+        blob = json.dumps({"video": video_content_hash(video_path), "model": model, "settings": settings},
+                          sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, key)
+
+    def open(self, key):
+        """CachedDetections for ``key``, or None if nothing is cached yet."""
+        path = self._entry_path(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            entry = CachedDetections(path)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # directory mtime is the LRU clock
+        return entry
+
+    def writer(self, key, frame_count):
+        return CacheWriter(self, key, frame_count)
+
+    def _merge(self, key, frame_count, frames):
+        with self._lock:
+            existing = self.open(key)
+            rows, offsets = [], [0]
+            present = np.zeros(frame_count, dtype=bool)
+            for i in range(frame_count):
+                dets = frames.get(i)
+                if dets is None and existing is not None:
+                    dets = existing.get(i)
+                if dets is not None:
+                    present[i] = True
+                    if len(dets.conf):
+                        rows.append(np.column_stack([dets.xyxy, dets.conf, dets.cls]).astype(np.float32))
+                offsets.append(offsets[-1] + (len(dets.conf) if dets is not None else 0))
+            table = np.concatenate(rows) if rows else np.zeros((0, 6), np.float32)
+            del existing  # release the memory maps before replacing the files
+
+            os.makedirs(self.root, exist_ok=True)
+            path = self._entry_path(key)
+            tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            os.makedirs(tmp, exist_ok=True)
+            np.save(os.path.join(tmp, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+            np.save(os.path.join(tmp, "present.npy"), present)
+            np.save(os.path.join(tmp, "dets.npy"), table)
+            # Swap by renames, so a reader opens either a complete entry or none (a miss), never a
+            # half-deleted one; files it already mapped stay valid after the old directory is removed
+            old = f"{path}.tmp-old-{os.getpid()}-{threading.get_ident()}"
+            if os.path.isdir(path):
+                os.replace(path, old)
+            os.replace(tmp, path)
+            shutil.rmtree(old, ignore_errors=True)
+            self._evict()
+
+    def _entry_size(self, path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and ".tmp-" not in entry.name:
+                entries.append((entry.stat().st_mtime, entry.path, self._entry_size(entry.path)))
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def stats(self):
+        if not os.path.isdir(self.root):
+            return {"entries": 0, "bytes": 0, "max_bytes": self.max_bytes}
+        entries = [e.path for e in os.scandir(self.root) if e.is_dir() and ".tmp-" not in e.name]
+        return {"entries": len(entries), "bytes": sum(self._entry_size(p) for p in entries),
+                "max_bytes": self.max_bytes}
@@ -0,0 +1,16 @@
+from config import Config
+from model_registry import ModelRegistry
+from postprocess import from_result
+
+# The model alone, so inference worker processes can load it without the rest of the pipeline.
+# Weights are loaded on first use or in the background (app.py), never at import
+model_registry = ModelRegistry(Config.YOLO_MODEL)
+
+
+def run_model_batch(frames, model=None, **kwargs):
+    """Run a shared model (the default one unless ``model`` names a variant) once over a list of frames."""
+    entry = model_registry.get_entry(model)
+    kwargs.setdefault("imgsz", Config.INFERENCE_IMGSZ)
+    # Only people are counted, so the class filter is pushed into the model's NMS
+    results = entry.model(frames, verbose=False, classes=[entry.class_ids["person"]], **kwargs)
+    return [from_result(r) for r in results]
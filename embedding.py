@@ -0,0 +1,110 @@
+import threading
+
+import numpy as np
+
+from postprocess import box_iou
+
+
+def crop_boxes(frame, boxes):
+    """Person crops of a frame (views, not copies), boxes clipped to the frame."""
+    height, width = frame.shape[:2]
+    crops = []
+    for x1, y1, x2, y2 in np.asarray(boxes, dtype=int).reshape(-1, 4).tolist():
+        x1, y1 = min(max(x1, 0), width - 1), min(max(y1, 0), height - 1)
+        x2, y2 = min(max(x2, x1 + 1), width), min(max(y2, y1 + 1), height)
+        crops.append(frame[y1:y2, x1:x2])
+    return crops
+
+
+class CropEmbedder:
+    """DeepSort's MobileNetV2 appearance model as a scheduler batch function.
+
+    Each request is the list of crops of one frame; all requests of a batch
+    (several frames, several feeds) go through the model together and every
+    request gets back its (n, D) float32 embeddings. The model is loaded on
+    first use.
+    """
+
+    def __init__(self, max_batch_size=64, gpu=True, half=True):
+        self.max_batch_size = max_batch_size
+        self.gpu = gpu
+        self.half = half
+        self.model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self.model is None:
+                from deep_sort_realtime.embedder.embedder_pytorch import MobileNetv2_Embedder
+
+                self.model = MobileNetv2_Embedder(half=self.half, max_batch_size=self.max_batch_size, bgr=True,
+                                                  gpu=self.gpu)
+        return self.model
+
+    def __call__(self, requests, **kwargs):
+        crops = [crop for request in requests for crop in request]
+        embeds = np.asarray(self._load().predict(crops), dtype=np.float32).reshape(len(crops), -1) if crops else None
+        results, start = [], 0
+        for request in requests:
+            results.append(embeds[start:start + len(request)] if len(request) else np.zeros((0, 0), np.float32))
+            start += len(request)
+        return results
+
+
+class FeedEmbedder:
+    """Appearance embeddings for one feed's detections, reusing those of people who barely moved.
+
+    A detection whose box overlaps the box an embedding was computed for by
+    at least ``reuse_iou`` gets that embedding again, for up to ``max_reuse``
+    frames; the remaining crops are submitted to the shared embedding
+    scheduler in one request, where they are batched with other feeds. The
+    cache only holds the current frame's detections, at most ``capacity``.
+    """
+
+    def __init__(self, submit, reuse_iou=0.9, max_reuse=30, capacity=256):
+        self.submit = submit
+        self.reuse_iou = reuse_iou
+        self.max_reuse = max_reuse
+        self.capacity = capacity
+        self.boxes = np.zeros((0, 4), np.float32)  # box each cached embedding was computed for
+        self.embeds = None
+        self.ages = np.zeros(0, dtype=int)  # frames the cached embedding has been reused
+        self.embedded = 0
+        self.reused = 0
+
+    def embed(self, frame, boxes):
+        """(N, D) embeddings for a frame's (N, 4) xyxy boxes."""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        source = np.full(len(boxes), -1)
+        if len(boxes) and len(self.boxes):
+            iou = box_iou(boxes, self.boxes)
+            best = iou.argmax(axis=1)
+            reuse = (iou[np.arange(len(boxes)), best] >= self.reuse_iou) & (self.ages[best] < self.max_reuse)
+            # One cached embedding serves one detection at most
+            for i in np.flatnonzero(reuse):
+                if best[i] not in source:
+                    source[i] = best[i]
+
+        fresh = np.flatnonzero(source < 0)
+        new_embeds = self.submit(crop_boxes(frame, boxes[fresh])).result() if len(fresh) else None
+        dim = new_embeds.shape[1] if new_embeds is not None else (self.embeds.shape[1] if self.embeds is not None else 0)
+        embeds = np.zeros((len(boxes), dim), np.float32)
+        ref_boxes = boxes.copy()
+        ages = np.zeros(len(boxes), dtype=int)
+        if len(fresh):
+            embeds[fresh] = new_embeds
+        cached = np.flatnonzero(source >= 0)
+        if len(cached):
+            embeds[cached] = self.embeds[source[cached]]
+            ref_boxes[cached] = self.boxes[source[cached]]
+            ages[cached] = self.ages[source[cached]] + 1
+        self.embedded += len(fresh)
+        self.reused += len(cached)
+
+        self.boxes, self.embeds, self.ages = ref_boxes[:self.capacity], embeds[:self.capacity], ages[:self.capacity]
+        return embeds
+
+    def stats(self):
+        total = self.embedded + self.reused
+        return {"embedded": self.embedded, "reused": self.reused,
+                "reuse_ratio": round(self.reused / total, 4) if total else 0.0}
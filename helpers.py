@@ -1,6 +1,7 @@
 import json
 from flask import session, redirect, url_for
 from functools import wraps
+from zones import zone_polygon
 
 def login_required(f):
     """Decorator for routes that need login"""
@@ -28,14 +29,11 @@ def serialize_zone(zone):
     }
 
 def scale_zones(zones_data, video_width, video_height, canvas_width=640, canvas_height=360):
-    """Scale drawn zones to video resolution"""
+    """Scale drawn zone polygons to video resolution"""
     zones, labels = [], []
     scale_x, scale_y = video_width / canvas_width, video_height / canvas_height
     for z in zones_data:
-        coords = json.loads(z.coordinates)
-        points = list(coords.values())
-        x1, y1 = min(p[0] for p in points), min(p[1] for p in points)
-        x2, y2 = max(p[0] for p in points), max(p[1] for p in points)
-        zones.append((int(x1 * scale_x), int(y1 * scale_y), int(x2 * scale_x), int(y2 * scale_y)))
+        points = zone_polygon(json.loads(z.coordinates))
+        zones.append([(int(x * scale_x), int(y * scale_y)) for x, y in points])
         labels.append(z.label)
     return zones, labels
@@ -0,0 +1,236 @@
+import math
+
+import numpy as np
+
+from postprocess import Detections, box_iou, centroids, empty_detections
+
+PLAN_MODES = ("full", "roi", "tiles", "auto")
+
+
+def merge_tiles(dets, tile_ids, truncated, iou_threshold=0.5, ios_threshold=0.8):
+    """Cross-tile NMS over detections already mapped to frame coordinates.
+
+    Each tile was already NMS'd by the model, so only boxes from different
+    tiles suppress each other: duplicates (IoU above ``iou_threshold``) and
+    people cut by a tile edge, whose partial box lies mostly inside the
+    full one from the neighbouring tile (intersection over the smaller box
+    above ``ios_threshold``). Boxes not ``truncated`` by an inner tile edge
+    win, then the higher confidence.
+    """
+    if len(dets.conf) < 2:
+        return dets
+    boxes = dets.xyxy
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    iou = box_iou(boxes, boxes)
+    inter = iou * (area[:, None] + area[None, :]) / (1 + iou)
+    ios = inter / np.maximum(np.minimum(area[:, None], area[None, :]), 1e-6)
+    overlapping = ((iou > iou_threshold) | (ios > ios_threshold)) & (tile_ids[:, None] != tile_ids[None, :])
+
+    keep = []
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    for i in np.lexsort((-dets.conf, truncated)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= overlapping[i]
+    keep = np.array(sorted(keep))
+    return Detections(dets.xyxy[keep], dets.conf[keep], dets.cls[keep])
+
+
+class PlannedDetections:
+    """Pending result of one planned frame; ``result()`` waits for every region and merges them."""
+
+    def __init__(self, planner, futures, audit_future=None):
+        self.planner = planner
+        self.futures = futures
+        self.audit_future = audit_future
+
+    def result(self, timeout=None):
+        dets = self.planner.merge([future.result(timeout) for future in self.futures])
+        if self.audit_future is not None:
+            self.planner.audit(dets, self.audit_future.result(timeout))
+        return dets
+
+
+class InferencePlanner:
+    """Chooses which parts of a feed's frames go to the detector, and at what size.
+
+    * ``full``: the whole frame at the model's input size (``imgsz``).
+    * ``roi``: one crop around the union of the zones, at the same pixel
+      density as the full frame, so the model input is smaller. People
+      outside the crop are not detected, so totals only cover the zones.
+    * ``tiles``: overlapping ``tile_size`` tiles (of the zone area, if it is
+      small enough, else the whole frame), each at the model's input size, run
+      as one batch and merged with cross-tile NMS. Distant people keep more
+      pixels than when a 4K frame is shrunk to ``imgsz``.
+    * ``auto``: tiles for frames whose longer side is at least
+      ``tile_min_side``, roi when the zones cover at most ``roi_max_fraction``
+      of the frame, full otherwise.
+
+    Boxes are always returned in full-frame coordinates. Model arguments
+    passed to ``submit()`` (input size, model variant, ...) apply to every
+    region; a roi crop keeps its size relative to the given ``imgsz``.
+    ``cost`` is the model work per frame relative to one full-frame call. Every
+    ``audit_every`` frames a full-frame call is run alongside, and ``recall``
+    reports the share of its detections (inside the planned area) that the
+    plan also found.
+    """
+
+    def __init__(self, submit, zone_index, width, height, mode="auto", imgsz=640, tile_size=1280, tile_overlap=0.2,
+                 tile_min_side=2560, roi_max_fraction=0.5, roi_margin=0.1, audit_every=300, conf_threshold=0.25):
+        if mode not in PLAN_MODES:
+            raise ValueError(f"Unknown inference plan mode: {mode}")
+        self.submit_fn = submit
+        self.width, self.height = int(width), int(height)
+        self.imgsz = imgsz
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.audit_every = audit_every
+        self.conf_threshold = conf_threshold
+        self.requested_mode = mode
+
+        area = self._zone_area(zone_index, roi_margin)
+        area_fraction = ((area[2] - area[0]) * (area[3] - area[1]) / (self.width * self.height)) if area else 1.0
+        if mode == "auto":
+            if max(self.width, self.height) >= tile_min_side:
+                mode = "tiles"
+            elif area is not None and area_fraction <= roi_max_fraction:
+                mode = "roi"
+            else:
+                mode = "full"
+        if mode == "roi" and area is None:
+            mode = "full"  # no zones to crop to
+        self.mode = mode
+
+        # Regions are (x1, y1, x2, y2, input scale); None runs at the model input size
+        if mode == "full":
+            self.regions = [(0, 0, self.width, self.height, None)]
+        elif mode == "roi":
+            self.regions = [area + (self._roi_scale(area),)]
+        else:
+            bounds = area if area is not None and area_fraction <= roi_max_fraction else (0, 0, self.width, self.height)
+            self.regions = [tile + (None,) for tile in self._tiles(bounds)]
+        self.cost = round(sum((1.0 if scale is None else scale) ** 2 for *_, scale in self.regions), 3)
+
+        self.frames = 0
+        self.audits = 0
+        self.recall_sum = 0.0
+        self.last_recall = None
+        self.extra_sum = 0
+
+    def _zone_area(self, zone_index, margin):
+        if zone_index is None or not len(zone_index):
+            return None
+        ys, xs = np.nonzero(zone_index.coverage())
+        if not len(xs):
+            return None
+        x1, y1, x2, y2 = int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1
+        # Margin so people standing on a zone edge are not cut off
+        pad_x = max(16, int((x2 - x1) * margin))
+        pad_y = max(16, int((y2 - y1) * margin))
+        return (max(0, x1 - pad_x), max(0, y1 - pad_y), min(self.width, x2 + pad_x), min(self.height, y2 + pad_y))
+
+    def _roi_scale(self, area):
+        # Same pixels per person as the full frame, on a smaller model input
+        return min(1.0, max(area[2] - area[0], area[3] - area[1]) / max(self.width, self.height))
+
+    def _region_kwargs(self, scale, kwargs):
+        if scale is None:
+            return kwargs
+        imgsz = kwargs.get("imgsz", self.imgsz)
+        return {**kwargs, "imgsz": int(min(imgsz, max(32, math.ceil(imgsz * scale / 32) * 32)))}
+
+    def _axis_starts(self, start, end):
+        length = end - start
+        if length <= self.tile_size:
+            return [start], length
+        step = self.tile_size * (1 - self.tile_overlap)
+        n = math.ceil((length - self.tile_size) / step) + 1
+        return [int(round(v)) for v in np.linspace(start, end - self.tile_size, n)], self.tile_size
+
+    def _tiles(self, bounds):
+        xs, tile_w = self._axis_starts(bounds[0], bounds[2])
+        ys, tile_h = self._axis_starts(bounds[1], bounds[3])
+        return [(x, y, x + tile_w, y + tile_h) for y in ys for x in xs]
+
+    def key(self):
+        """What the plan contributes to the detection cache key (None for full frames)."""
+        if self.mode == "full":
+            return None
+        return {"mode": self.mode, "regions": [[x1, y1, x2, y2, scale] for x1, y1, x2, y2, scale in self.regions]}
+
+    def submit(self, frame, **kwargs):
+        """Queue the frame's regions on the scheduler; returns a PlannedDetections."""
+        self.frames += 1
+        futures = []
+        for x1, y1, x2, y2, scale in self.regions:
+            if self.mode == "full":
+                futures.append(self.submit_fn(frame, **kwargs))
+            else:
+                futures.append(self.submit_fn(np.ascontiguousarray(frame[y1:y2, x1:x2]),
+                                              **self._region_kwargs(scale, kwargs)))
+        audit_future = None
+        if self.mode != "full" and self.audit_every and (self.frames - 1) % self.audit_every == 0:
+            audit_future = self.submit_fn(frame, **kwargs)
+        return PlannedDetections(self, futures, audit_future)
+
+    def merge(self, results):
+        if self.mode == "full":
+            return results[0]
+        bounds = self._bounds()
+        parts, tile_ids, truncated = [], [], []
+        for i, ((x1, y1, x2, y2, _), dets) in enumerate(zip(self.regions, results)):
+            if len(dets.conf):
+                xyxy = dets.xyxy + np.array([x1, y1, x1, y1], dtype=np.float32)
+                parts.append(Detections(xyxy, dets.conf, dets.cls))
+                tile_ids.append(np.full(len(dets.conf), i))
+                # Touching a tile edge that is not also the edge of the planned area
+                cut = np.zeros(len(dets.conf), dtype=bool)
+                for axis, edge, outer in ((0, x1, bounds[0]), (1, y1, bounds[1])):
+                    if edge > outer:
+                        cut |= xyxy[:, axis] <= edge + 2
+                for axis, edge, outer in ((2, x2, bounds[2]), (3, y2, bounds[3])):
+                    if edge < outer:
+                        cut |= xyxy[:, axis] >= edge - 2
+                truncated.append(cut)
+        if not parts:
+            return empty_detections()
+        merged = Detections(*(np.concatenate(column) for column in zip(*parts)))
+        if len(parts) == 1:
+            return merged
+        return merge_tiles(merged, np.concatenate(tile_ids), np.concatenate(truncated))
+
+    def _bounds(self):
+        """Bounding box of all regions, i.e. the planned area."""
+        return (min(r[0] for r in self.regions), min(r[1] for r in self.regions),
+                max(r[2] for r in self.regions), max(r[3] for r in self.regions))
+
+    def audit(self, planned, full):
+        """Compare the plan's detections with a full-frame call on the same frame."""
+        planned_boxes = planned.xyxy[planned.conf >= self.conf_threshold]
+        full_boxes = full.xyxy[full.conf >= self.conf_threshold]
+        # Only the area the plan looks at is expected to be covered
+        x1, y1, x2, y2 = self._bounds()
+        c = centroids(full_boxes)
+        full_boxes = full_boxes[(c[:, 0] >= x1) & (c[:, 0] < x2) & (c[:, 1] >= y1) & (c[:, 1] < y2)]
+
+        matched = 0
+        if len(full_boxes) and len(planned_boxes):
+            matched = int((box_iou(full_boxes, planned_boxes).max(axis=1) >= 0.5).sum())
+        recall = matched / len(full_boxes) if len(full_boxes) else 1.0
+        self.audits += 1
+        self.recall_sum += recall
+        self.last_recall = round(recall, 4)
+        self.extra_sum += max(0, len(planned_boxes) - matched)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "requested_mode": self.requested_mode,
+            "regions": len(self.regions),
+            "cost": self.cost,
+            "audits": self.audits,
+            "recall": round(self.recall_sum / self.audits, 4) if self.audits else None,
+            "last_recall": self.last_recall,
+            "extra_per_audit": round(self.extra_sum / self.audits, 2) if self.audits else None,
+        }
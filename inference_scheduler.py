@@ -0,0 +1,119 @@
+import threading
+import queue
+import time
+from concurrent.futures import Future
+
+
+class InferenceScheduler:
+    """Collects frames submitted by many feeds and runs them as batched model calls.
+
+    Each analysis thread calls ``submit(frame)`` and waits on the returned future.
+    A single worker thread drains the pending queue, waiting at most ``max_wait_ms``
+    for a batch to fill up to ``max_batch_size`` frames, then hands the whole batch
+    to ``run_batch`` and routes every result back to the future that asked for it.
+    Requests submitted with different keyword arguments are never mixed in one call.
+
+    With ``workers > 1`` several collector threads run batches concurrently, for
+    a ``run_batch`` that hands work to other processes.
+
+    Long-running callers (analysis loops) ``register()`` themselves so the worker
+    stops waiting as soon as every active feed has a frame in the batch.
+
+    ``on_batch(n_frames, seconds)``, if given, is called after every model call.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=10, name="inference", workers=1, on_batch=None):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.on_batch = on_batch
+        self._pending = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self.active = 0
+        self.batches_run = 0
+        self.frames_run = 0
+        self.last_batch_size = 0
+
+    def start(self):
+        with self._lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._worker, name=f"{self.name}-scheduler-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def register(self):
+        with self._lock:
+            self.active += 1
+
+    def unregister(self):
+        with self._lock:
+            self.active = max(0, self.active - 1)
+
+    @property
+    def queue_depth(self):
+        return self._pending.qsize()
+
+    def submit(self, frame, **kwargs):
+        """Queue one frame for inference and return a Future for its result."""
+        self.start()
+        future = Future()
+        key = tuple(sorted(kwargs.items()))
+        self._pending.put((key, frame, future))
+        return future
+
+    def infer(self, frame, timeout=None, **kwargs):
+        """Blocking helper: submit a frame and wait for its result."""
+        return self.submit(frame, **kwargs).result(timeout=timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires."""
+        batch = [self._pending.get()]
+        target = min(self.max_batch_size, max(1, self.active))
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < target:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._pending.get_nowait())
+                else:
+                    batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Never leave already-queued frames behind for the next round
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+
+            # Group by call settings so each model call sees uniform arguments
+            groups = {}
+            for key, frame, future in batch:
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault(key, []).append((frame, future))
+
+            for key, items in groups.items():
+                frames = [frame for frame, _ in items]
+                started = time.perf_counter()
+                try:
+                    results = self.run_batch(frames, **dict(key))
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
+                    continue
+                for (_, future), result in zip(items, results):
+                    future.set_result(result)
+                self.batches_run += 1
+                self.frames_run += len(frames)
+                self.last_batch_size = len(frames)
+                if self.on_batch is not None:
+                    self.on_batch(len(frames), time.perf_counter() - started)
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+def tuning_steps(imgsz_ladder, models, max_imgsz=None):
+    """(model, imgsz) pairs from cheapest to most expensive.
+
+    The first model climbs the input size ladder up to ``max_imgsz``; the
+    larger ``models`` follow at that top size.
+    """
+    sizes = sorted(s for s in imgsz_ladder if max_imgsz is None or s <= max_imgsz) or [min(imgsz_ladder)]
+    steps = [(models[0], size) for size in sizes]
+    steps += [(model, sizes[-1]) for model in models[1:]]
+    return steps
+
+
+class LatencyTuner:
+    """Keeps a feed's detector latency within ``budget_ms`` by moving along ``steps``.
+
+    ``observe()`` gets the time each detector call took as seen by the feed
+    (queueing behind other feeds included, so adding feeds pushes it down).
+    After every ``window`` calls the 90th percentile is compared with the
+    budget: above it the tuner steps down, below ``headroom`` of it one step
+    up. A step left for being too slow is not retried for ``cooldown``
+    windows, doubling each time it fails again, so the tuner settles instead
+    of oscillating. Steps with a model that is not loaded yet are loaded in
+    the background (``prepare``) and only taken once ``is_ready`` says so.
+    """
+
+    def __init__(self, steps, budget_ms, start=0, window=20, headroom=0.6, cooldown=10, is_ready=None, prepare=None):
+        self.steps = list(steps)
+        self.budget = budget_ms / 1000.0
+        self.index = int(np.clip(start, 0, len(self.steps) - 1))
+        self.window = max(1, int(window))
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.is_ready = is_ready or (lambda model: True)
+        self.prepare = prepare or (lambda model: None)
+        self.samples = []
+        self.windows = 0
+        self.blocked = {}  # step index -> window until which it is not retried
+        self.failures = {}  # step index -> times in a row it went over budget
+        self.latency = {}  # step index -> p90 seconds of its last window
+        self.changes = 0
+
+    @property
+    def step(self):
+        return self.steps[self.index]
+
+    def observe(self, seconds):
+        """Record one detector call; returns True when the settings changed."""
+        self.samples.append(seconds)
+        if len(self.samples) < self.window:
+            return False
+        p90 = float(np.percentile(self.samples, 90))
+        self.samples = []
+        self.windows += 1
+        self.latency[self.index] = p90
+
+        target = self.index
+        if p90 > self.budget:
+            if self.index > 0:
+                failures = self.failures[self.index] = self.failures.get(self.index, 0) + 1
+                self.blocked[self.index] = self.windows + self.cooldown * 2 ** min(failures - 1, 6)
+                target = self.index - 1
+        else:
+            self.failures.pop(self.index, None)
+            if p90 < self.budget * self.headroom and self.index + 1 < len(self.steps):
+                up = self.index + 1
+                model = self.steps[up][0]
+                if self.blocked.get(up, 0) <= self.windows:
+                    if self.is_ready(model):
+                        target = up
+                    else:
+                        self.prepare(model)
+        if target == self.index:
+            return False
+        self.index = target
+        self.changes += 1
+        return True
+
+    def stats(self):
+        model, imgsz = self.step
+        return {
+            "model": model,
+            "imgsz": imgsz,
+            "budget_ms": round(self.budget * 1000, 1),
+            "p90_ms": {f"{self.steps[i][0]}@{self.steps[i][1]}": round(seconds * 1000, 1)
+                       for i, seconds in sorted(self.latency.items())},
+            "changes": self.changes,
+        }
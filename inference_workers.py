@@ -0,0 +1,186 @@
+import multiprocessing as mp
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from postprocess import Detections
+
+
+class SharedFrameRing:
+    """Fixed-size frame slots in one shared-memory block.
+
+    The parent copies each frame into a slot once; a worker process maps the
+    same slot as an ndarray view, so frames never go through pickling.
+    """
+
+    def __init__(self, n_slots, slot_bytes, name=None):
+        self.n_slots = n_slots
+        self.slot_bytes = slot_bytes
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=n_slots * slot_bytes)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, shape, dtype=np.uint8):
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot, frame):
+        """Copy ``frame`` into ``slot``; returns its (shape, dtype) or None if it does not fit."""
+        if frame.nbytes > self.slot_bytes:
+            return None
+        np.copyto(self.view(slot, frame.shape, frame.dtype), frame)
+        return frame.shape, frame.dtype.str
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(shm_name, first_slot, slot_bytes, n_slots, conn):
+    """Worker process: load the model, then answer batch requests until told to stop."""
+    # Imported here so the parent never pays for it and each child gets its own model
+    from detector import model_registry, run_model_batch
+
+    ring = SharedFrameRing(n_slots, slot_bytes, name=shm_name)
+    try:
+        entry = model_registry.get_entry()
+        conn.send(("ready", {"model": entry.status(), "class_ids": entry.class_ids}))
+    except Exception as e:
+        conn.send(("error", str(e)))
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        frames_meta, kwargs = message
+        frames = []
+        for i, meta in enumerate(frames_meta):
+            if isinstance(meta, np.ndarray):
+                frames.append(meta)  # did not fit in a slot, sent inline
+            else:
+                shape, dtype = meta
+                frames.append(ring.view(first_slot + i, shape, dtype))
+        try:
+            dets = run_model_batch(frames, **kwargs)
+            conn.send(("ok", [tuple(d) for d in dets]))
+        except Exception as e:
+            conn.send(("error", str(e)))
+        del frames
+    ring.shm.close()
+
+
+class ProcessInferencePool:
+    """Runs model batches in worker processes fed through a SharedFrameRing.
+
+    Each worker owns ``max_batch_size`` consecutive slots and a pipe. ``run_batch``
+    has the same signature as ``detector.run_model_batch``, so it plugs into
+    the InferenceScheduler; give the scheduler one thread per worker so batches
+    run in parallel. Only compact Detections arrays come back over the pipe.
+    Nothing is started until the first batch, ``class_id()`` or ``start()``,
+    which returns once every worker has reported its start-up.
+    """
+
+    def __init__(self, n_workers=2, max_batch_size=8, slot_bytes=1920 * 1080 * 3):
+        self.n_workers = max(1, int(n_workers))
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.slot_bytes = int(slot_bytes)
+        self.ring = None
+        self.workers = []
+        self.worker_status = {}
+        self.class_ids = {}
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the workers and wait until each has loaded the model (or failed to)."""
+        with self._lock:
+            if self.workers:
+                return
+            ctx = mp.get_context("spawn")  # never fork a process that holds threads and torch state
+            n_slots = self.n_workers * self.max_batch_size
+            self.ring = SharedFrameRing(n_slots, self.slot_bytes)
+            workers = []
+            for i in range(self.n_workers):
+                parent_conn, child_conn = ctx.Pipe()
+                first_slot = i * self.max_batch_size
+                process = ctx.Process(target=_worker_main, name=f"inference-worker-{i}", daemon=True,
+                                      args=(self.ring.name, first_slot, self.slot_bytes, n_slots, child_conn))
+                process.start()
+                workers.append({"index": i, "process": process, "conn": parent_conn, "first_slot": first_slot,
+                                "lock": threading.Lock(), "ready": False})
+                self.worker_status[i] = {"state": "loading"}
+            # Class ids come from the start-up handshake, so they are known before the first batch
+            for worker in workers:
+                try:
+                    self._record_startup(worker, *worker["conn"].recv())
+                except EOFError:
+                    self.worker_status[worker["index"]] = {"state": "error", "error": "worker exited during start-up"}
+                self._idle.put(worker)
+            self.workers = workers
+
+    def _record_startup(self, worker, kind, payload):
+        if kind == "ready":
+            worker["ready"] = True
+            self.class_ids = payload["class_ids"]
+            self.worker_status[worker["index"]] = {"state": "ready", "model": payload["model"]}
+        else:
+            self.worker_status[worker["index"]] = {"state": "error", "error": payload}
+
+    def class_id(self, label):
+        """Model class id of ``label``, starting the workers first if needed."""
+        self.start()
+        if label not in self.class_ids:
+            raise RuntimeError(f"No inference worker has loaded the model: {self.worker_status}")
+        return self.class_ids[label]
+
+    def run_batch(self, frames, **kwargs):
+        self.start()
+        results = []
+        # Split batches larger than a worker's slot range
+        for offset in range(0, len(frames), self.max_batch_size):
+            chunk = frames[offset:offset + self.max_batch_size]
+            worker = self._idle.get()
+            worker["lock"].acquire()
+            try:
+                meta = []
+                for i, frame in enumerate(chunk):
+                    frame = np.ascontiguousarray(frame)
+                    slot_meta = self.ring.write(worker["first_slot"] + i, frame)
+                    meta.append(slot_meta if slot_meta is not None else frame)
+                worker["conn"].send((meta, kwargs))
+                kind, payload = worker["conn"].recv()
+            finally:
+                worker["lock"].release()
+                self._idle.put(worker)
+            if kind != "ok":
+                raise RuntimeError(payload)
+            results.extend(Detections(*d) for d in payload)
+        return results
+
+    def status(self):
+        return {
+            "mode": "process",
+            "ready": bool(self.workers) and all(s.get("state") == "ready" for s in self.worker_status.values()),
+            "workers": self.worker_status,
+        }
+
+    def stop(self):
+        for worker in self.workers:
+            try:
+                worker["conn"].send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            worker["process"].join(timeout=5)
+        self.workers = []
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
@@ -0,0 +1,132 @@
+import struct
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+from config import Config
+from count_history import count_history
+from postprocess import filter_detections, zone_counts as count_zones, FeedDetections, detections_to_dicts
+import yolo_service
+
+# Length-prefixed frame stream (application/x-frame-stream): per frame a
+# big-endian uint32 JPEG length and float64 capture timestamp (Unix seconds),
+# then the JPEG bytes
+STREAM_HEADER = struct.Struct(">Id")
+STREAM_CONTENT_TYPE = "application/x-frame-stream"
+
+
+def decode_frame(data):
+    """Decode JPEG/PNG bytes into a BGR frame, None if they are not an image."""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def _read_exact(stream, n):
+    chunks, remaining = [], n
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def iter_frame_stream(stream, max_frame_bytes):
+    """Yield ``(timestamp, jpeg bytes)`` from a length-prefixed frame stream as they arrive."""
+    while True:
+        header = _read_exact(stream, STREAM_HEADER.size)
+        if not header:
+            return
+        if len(header) < STREAM_HEADER.size:
+            raise ValueError("Truncated frame header")
+        length, timestamp = STREAM_HEADER.unpack(header)
+        if length > max_frame_bytes:
+            raise ValueError(f"Frame of {length} bytes exceeds the limit of {max_frame_bytes}")
+        data = _read_exact(stream, length)
+        if len(data) < length:
+            raise ValueError("Truncated frame")
+        yield timestamp, data
+
+
+class FrameIngestor:
+    """Counts people in frames pushed by a client camera, through the shared inference scheduler.
+
+    ``zone_index_for(width, height)`` returns the feed's ZoneIndex at a
+    resolution (see zone_cache.py). Up to ``max_in_flight`` frames are queued
+    on the scheduler at a time, so frames of one request are batched with
+    each other and with the running feeds while later ones are still being
+    received. ``add()`` hands back the results of the frames that finished in
+    the meantime and ``finish()`` the rest, so nothing accumulates over a long
+    stream. Results are also published as the feed's latest result (SSE,
+    count history) unless an analysis thread owns the feed.
+    """
+
+    def __init__(self, feed_id, zone_index_for, max_in_flight=8, with_detections=False):
+        self.feed_id = feed_id
+        self.zone_index_for = zone_index_for
+        self.max_in_flight = max(1, max_in_flight)
+        self.with_detections = with_detections
+        settings = yolo_service.inference_settings.get(feed_id, yolo_service.DEFAULT_INFERENCE)
+        self.kwargs = yolo_service.model_kwargs(settings["model"], settings["imgsz"], settings["conf"],
+                                                settings["max_det"])
+        self.conf_threshold = settings["conf"] if settings["conf"] is not None else Config.PERSON_CONF_THRESHOLD
+        self.pending = deque()
+        self.frames = 0
+
+    def add(self, data, timestamp=None):
+        """Decode and queue one encoded frame; returns the results finished so far, in frame order."""
+        index = self.frames
+        self.frames += 1
+        frame = decode_frame(data)
+        if frame is None:
+            self.pending.append((index, timestamp, None, None))
+        else:
+            future = yolo_service.scheduler.submit(frame, **self.kwargs)
+            self.pending.append((index, timestamp, frame.shape, future))
+        results = []
+        while self.pending and (len(self.pending) >= self.max_in_flight or self.pending[0][3] is None or
+                                self.pending[0][3].done()):
+            results.append(self._finish(*self.pending.popleft()))
+        return results
+
+    def finish(self):
+        """Wait for every queued frame; returns their results in frame order."""
+        results = []
+        while self.pending:
+            results.append(self._finish(*self.pending.popleft()))
+        return results
+
+    def _finish(self, index, timestamp, shape, future):
+        if future is None:
+            return {"index": index, "timestamp": timestamp, "error": "Cannot decode frame"}
+        dets = filter_detections(future.result(), yolo_service.person_class_id(), self.conf_threshold)
+        boxes = dets.xyxy.astype(int)
+        zone_index = self.zone_index_for(shape[1], shape[0])
+        zone_counts = count_zones(zone_index.membership(boxes))
+        counts = {"total": len(boxes), "zones": {label: count for label, count in zip(zone_index.labels, zone_counts)}}
+        result = {"index": index, "timestamp": timestamp, **counts}
+        detections = FeedDetections(boxes, None, dets.conf)
+        if self.with_detections:
+            result["detections"] = detections_to_dicts(detections)
+        self._publish(counts, detections, timestamp)
+        return result
+
+    def _publish(self, counts, detections, timestamp):
+        feed_id = self.feed_id
+        if feed_id in yolo_service.analysis_threads:
+            return
+        yolo_service.analysis_results[feed_id] = counts
+        yolo_service.analysis_detections[feed_id] = detections
+        stats = yolo_service.feed_stats.setdefault(feed_id, {"source": "ingest", "frames_analyzed": 0})
+        stats["frames_analyzed"] = stats.get("frames_analyzed", 0) + 1
+        when = None
+        if timestamp is not None:
+            stats["latency_ms"] = max(0.0, (time.time() - timestamp) * 1000)
+            when = datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+        count_history.record(feed_id, counts, when)
+        yolo_service.result_notifier.publish(feed_id, {"state": "running", "counts": counts, "detections": detections})
@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class KeyframeScheduler:
+    """Runs the detector every ``interval`` frames while a tracker fills in the rest.
+
+    ``next_frame()`` says whether the current frame is a keyframe; the tracker's
+    confirmed tracks on each keyframe go to ``keyframe()``. With ``adaptive`` the
+    interval follows the crowd: it is chosen so that a fast-moving person (90th
+    percentile of matched tracks) moves at most ``max_shift`` of their own box
+    height between keyframes, within 1..``max_interval`` frames.
+    """
+
+    def __init__(self, interval, adaptive=True, max_interval=10, max_shift=0.25, smoothing=0.3):
+        self.interval = max(1, int(interval))
+        self.adaptive = adaptive
+        self.max_interval = max(self.interval, int(max_interval)) if adaptive else self.interval
+        self.max_shift = max_shift
+        self.smoothing = smoothing
+        self.since = 0
+        self.speed = None  # box heights per frame
+        self.frames = 0
+        self.keyframes = 0
+        self._last = {}
+
+    def next_frame(self):
+        self.frames += 1
+        self.since += 1
+        return self.since >= self.interval
+
+    def keyframe(self, track_ids, boxes):
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        current = {tid: ((x1 + x2) / 2, (y1 + y2) / 2, max(y2 - y1, 1.0))
+                   for tid, (x1, y1, x2, y2) in zip(track_ids or [], boxes.tolist())}
+        if self.adaptive and self._last and self.since:
+            shifts = [np.hypot(cx - self._last[tid][0], cy - self._last[tid][1]) / self._last[tid][2]
+                      for tid, (cx, cy, _) in current.items() if tid in self._last]
+            if shifts:
+                speed = float(np.percentile(shifts, 90)) / self.since
+                self.speed = speed if self.speed is None else (1 - self.smoothing) * self.speed + self.smoothing * speed
+                self.interval = int(np.clip(self.max_shift / max(self.speed, 1e-6), 1, self.max_interval))
+        self._last = current
+        self.since = 0
+        self.keyframes += 1
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "speed": round(self.speed, 4) if self.speed is not None else None,
+            "keyframe_ratio": round(self.keyframes / self.frames, 4) if self.frames else 1.0,
+        }
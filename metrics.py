@@ -0,0 +1,205 @@
+import bisect
+import math
+import threading
+
+# Seconds; covers sub-millisecond stages up to a stalled model call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+    def set(self, value):
+        """Mirror a counter that is maintained elsewhere (only ever moves up, or resets with its source)."""
+        self.value = value
+
+    def samples(self, name):
+        return [(name + "_total", (), self.value)]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+    def samples(self, name):
+        return [(name, (), self.value)]
+
+
+class _HistogramChild:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self, name):
+        samples, cumulative = [], 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            cumulative += count
+            samples.append((name + "_bucket", (("le", _format_value(float(bound))),), cumulative))
+        samples.append((name + "_sum", (), self.sum))
+        samples.append((name + "_count", (), cumulative))
+        return samples
+
+
+class Metric:
+    """A metric family: one child series per distinct set of label values.
+
+    Children are created once under a lock and then updated without locking.
+    Every series in this app has a single writer (a feed's analysis thread,
+    the scheduler thread, or the scrape-time collector), so the GIL is enough
+    to keep the updates consistent and instrumentation stays cheap on the
+    frame loop.
+    """
+
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, **labels):
+        """Drop every series whose labels match the given subset (e.g. ``feed=3``)."""
+        positions = [(self.labelnames.index(name), str(value)) for name, value in labels.items()]
+        with self._lock:
+            for key in [k for k in self._children if all(k[i] == v for i, v in positions)]:
+                del self._children[key]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            for sample_name, extra, value in child.samples(self.name):
+                lines.append(f"{sample_name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(float(b) for b in buckets)
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class MetricsRegistry:
+    """All metric families plus collectors that refresh scrape-time gauges."""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def add_collector(self, collect):
+        self.collectors.append(collect)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        for collect in self.collectors:
+            collect()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Updated on the hot path
+stage_seconds = Histogram("crowd_feed_stage_seconds", "Time per analysed frame spent in each pipeline stage.",
+                          ["feed", "stage"])
+inference_batch_size = Histogram("crowd_inference_batch_size", "Frames per model call.",
+                                 buckets=BATCH_SIZE_BUCKETS)
+inference_batch_seconds = Histogram("crowd_inference_batch_seconds", "Duration of one model call.")
+
+# Refreshed at scrape time from the analysis state
+feed_fps = Gauge("crowd_feed_fps", "Achieved analysis frames per second.", ["feed"])
+feed_latency_seconds = Gauge("crowd_feed_latency_seconds", "Capture-to-result latency of the last frame.", ["feed"])
+feed_people = Gauge("crowd_feed_people", "People counted in the last analysed frame.", ["feed"])
+feed_tracks = Gauge("crowd_feed_tracks", "Confirmed tracker tracks in the last analysed frame.", ["feed"])
+feed_detector_skip_ratio = Gauge("crowd_feed_detector_skip_ratio",
+                                 "Share of frames analysed without running the detector (motion gate, keyframes).",
+                                 ["feed"])
+feed_inference_cost = Gauge("crowd_feed_inference_cost",
+                            "Model work per frame of the feed's inference plan, relative to one full-frame call.",
+                            ["feed"])
+feed_plan_recall = Gauge("crowd_feed_plan_recall",
+                         "Mean recall of the inference plan against periodic full-frame audits.", ["feed"])
+feed_subscribers = Gauge("crowd_feed_stream_subscribers", "Open MJPEG stream viewers.", ["feed"])
+feed_frames = Counter("crowd_feed_frames_analyzed", "Frames analysed since the feed was started.", ["feed"])
+feed_dropped = Counter("crowd_feed_dropped_frames", "Live frames overwritten before analysis.", ["feed"])
+feed_skipped = Counter("crowd_feed_skipped_frames", "File frames skipped to keep up with playback.", ["feed"])
+inference_queue_depth = Gauge("crowd_inference_queue_depth", "Frames waiting for the inference scheduler.")
+model_load_seconds = Gauge("crowd_model_load_seconds", "Time taken to load the model weights.", ["model"])
+model_warmup_seconds = Gauge("crowd_model_warmup_seconds", "Time taken by the warm-up inference.", ["model"])
+model_ready = Gauge("crowd_model_ready", "1 once the model is loaded and warmed up.")
+
+
+def forget_feed(feed_id):
+    """Drop every per-feed series of a stopped feed."""
+    for metric in REGISTRY.metrics:
+        if "feed" in metric.labelnames:
+            metric.remove(feed=feed_id)
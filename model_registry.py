@@ -0,0 +1,135 @@
+import threading
+import time
+
+import numpy as np
+
+from tracing import logger
+
+
+class ModelEntry:
+    """Load state of one set of model weights."""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = "unloaded"  # unloaded -> loading -> ready | error
+        self.model = None
+        self.class_ids = {}
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.error = None
+        self.failures = 0  # failed loads in a row
+        self.retry_at = 0.0  # monotonic time after which a failed load is retried
+        self.ready = threading.Event()
+
+    def status(self):
+        return {
+            "name": self.name,
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+            "failures": self.failures,
+        }
+
+
+class ModelRegistry:
+    """Loads YOLO weights on demand or in the background and tracks their readiness.
+
+    Nothing is imported or loaded at construction, so importing the analysis
+    code (and starting the web app) does not wait for torch or the weights.
+    ``load_async()`` starts loading on a background thread; ``get()`` returns the
+    model, loading it on the calling thread or waiting for an in-flight load.
+    Each load ends with a real, timed warm-up inference. A failed load is
+    retried by the next ``get()`` after ``retry_seconds``, doubling with every
+    failure in a row up to ``max_retry_seconds``; until then ``get()`` fails fast.
+    """
+
+    def __init__(self, default_name, warmup_size=640, retry_seconds=5.0, max_retry_seconds=300.0):
+        self.default_name = default_name
+        self.warmup_size = warmup_size
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, name, retry=False):
+        """Return the entry for ``name`` and whether the caller must load it."""
+        name = name or self.default_name
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = ModelEntry(name)
+            claimed = entry.state == "unloaded" or (
+                entry.state == "error" and (retry or time.monotonic() >= entry.retry_at))
+            if claimed:
+                entry.state = "loading"
+                entry.error = None
+                entry.ready.clear()
+        return entry, claimed
+
+    def _load(self, entry):
+        try:
+            from ultralytics import YOLO
+
+            start = time.perf_counter()
+            model = YOLO(entry.name)
+            entry.load_seconds = round(time.perf_counter() - start, 3)
+            logger.info("YOLO model %s loaded in %s seconds", entry.name, entry.load_seconds)
+
+            # Warm up with a real inference (a non-stream call runs immediately)
+            start = time.perf_counter()
+            model(np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8), verbose=False)
+            entry.warmup_seconds = round(time.perf_counter() - start, 3)
+            logger.info("YOLO model %s warmed up in %s seconds", entry.name, entry.warmup_seconds)
+
+            entry.class_ids = {label: i for i, label in model.names.items()}
+            entry.model = model
+            entry.failures = 0
+            entry.state = "ready"
+        except Exception as e:
+            entry.error = str(e)
+            entry.failures += 1
+            entry.retry_at = time.monotonic() + min(self.max_retry_seconds,
+                                                    self.retry_seconds * 2 ** (entry.failures - 1))
+            entry.state = "error"
+            logger.error("Failed to load YOLO model %s: %s", entry.name, e)
+        finally:
+            entry.ready.set()
+
+    def load_async(self, name=None):
+        """Start loading ``name`` on a background thread unless it is loaded or loading (retries failures)."""
+        entry, claimed = self._entry(name, retry=True)
+        if claimed:
+            threading.Thread(target=self._load, args=(entry,), name=f"load-{entry.name}", daemon=True).start()
+        return entry
+
+    def get_entry(self, name=None, timeout=None):
+        """Return the ready entry, loading it (or retrying a failed load once its backoff is over) if needed."""
+        entry, claimed = self._entry(name)
+        if claimed:
+            self._load(entry)
+        elif not entry.ready.wait(timeout):
+            raise TimeoutError(f"Model {entry.name} is still loading")
+        if entry.state != "ready":
+            raise RuntimeError(f"Model {entry.name} failed to load: {entry.error}")
+        return entry
+
+    def get(self, name=None, timeout=None):
+        """Return the loaded model, loading it first if needed."""
+        return self.get_entry(name, timeout).model
+
+    def class_id(self, label, name=None):
+        return self.get_entry(name).class_ids[label]
+
+    def is_ready(self, name=None):
+        entry = self._entries.get(name or self.default_name)
+        return entry is not None and entry.state == "ready"
+
+    def status(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "default": self.default_name,
+            "ready": self.is_ready(),
+            "models": {entry.name: entry.status() for entry in entries},
+        }
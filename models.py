@@ -26,3 +26,26 @@ class Zone(db.Model):
     feed_id = db.Column(db.Integer, db.ForeignKey('feed.id'), nullable=False)
     label = db.Column(db.String(150), nullable=False)
     coordinates = db.Column(db.Text, nullable=False)  # JSON string
+
+class ZoneCount(db.Model):
+    """Sampled people count of one zone (or the whole frame, see count_history.TOTAL_ZONE)."""
+    id = db.Column(db.Integer, primary_key=True)
+    feed_id = db.Column(db.Integer, db.ForeignKey('feed.id'), nullable=False)
+    zone = db.Column(db.String(150), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    __table_args__ = (db.Index('ix_zone_count_feed_zone_ts', 'feed_id', 'zone', 'timestamp'),)
+
+class ZoneCountRollup(db.Model):
+    """Per-minute or per-hour aggregate of ZoneCount samples."""
+    id = db.Column(db.Integer, primary_key=True)
+    feed_id = db.Column(db.Integer, db.ForeignKey('feed.id'), nullable=False)
+    zone = db.Column(db.String(150), nullable=False)
+    resolution = db.Column(db.String(10), nullable=False)  # 'minute' or 'hour'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=0)
+    count_sum = db.Column(db.Integer, nullable=False, default=0)
+    count_min = db.Column(db.Integer, nullable=False)
+    count_max = db.Column(db.Integer, nullable=False)
+    __table_args__ = (db.UniqueConstraint('feed_id', 'zone', 'resolution', 'bucket_start',
+                                          name='uq_zone_count_rollup_bucket'),)
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decides per frame whether the detector needs to run, from a cheap motion check.
+
+    Frames are shrunk to ``width`` pixels, greyed and blurred, then compared
+    with the frame the detector last ran on (not the previous frame, so slow
+    movement still adds up). The detector runs when more than ``min_changed``
+    of the watched pixels differ by over ``pixel_threshold`` grey levels, and
+    at least every ``max_skip`` frames regardless, so counts are refreshed
+    even if the check misses something. ``mask`` (an H x W bool array at full
+    resolution, e.g. ``ZoneIndex.coverage()``) limits the check to zones.
+    """
+
+    def __init__(self, mask=None, width=160, pixel_threshold=25, min_changed=0.002, max_skip=15):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.max_skip = max_skip
+        self.full_mask = mask
+        self.mask = None
+        self.reference = None
+        self.since_detection = 0
+        self.frames = 0
+        self.skipped = 0
+        self.last_changed = 0.0
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        small = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        if self.mask is None and self.full_mask is not None:
+            self.mask = cv2.resize(self.full_mask.astype(np.uint8), size, interpolation=cv2.INTER_NEAREST) > 0
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def check(self, frame):
+        """True if the detector should run on ``frame`` (which then becomes the reference)."""
+        self.frames += 1
+        small = self._prepare(frame)
+        if self.reference is not None and self.since_detection < self.max_skip:
+            changed = cv2.absdiff(small, self.reference) > self.pixel_threshold
+            if self.mask is not None:
+                watched = max(int(self.mask.sum()), 1)
+                self.last_changed = np.count_nonzero(changed & self.mask) / watched
+            else:
+                self.last_changed = np.count_nonzero(changed) / changed.size
+            if self.last_changed <= self.min_changed:
+                self.since_detection += 1
+                self.skipped += 1
+                return False
+        self.reference = small
+        self.since_detection = 0
+        return True
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / self.frames, 4) if self.frames else 0.0,
+            "changed": round(float(self.last_changed), 5),
+        }
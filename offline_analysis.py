@@ -0,0 +1,282 @@
+"""Offline bulk analysis of video files.
+
+Decodes a file sequentially (optionally every ``stride``-th frame), runs batched
+inference with no drawing, encoding or pacing, and produces a per-frame,
+per-zone count time series. Frames already in the detection cache are not sent
+to the model, and a fully cached file is recounted without decoding it at all. Used by the ``/api/feeds/<id>/offline_jobs`` API and
+as a command line tool:
+
+    python offline_analysis.py static/videos/<file>.mp4 --feed-id 7 --stride 2 --out counts.csv
+"""
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+import uuid
+
+import cv2
+
+from capture import FrameGrabber
+from config import Config
+from postprocess import filter_detections, zone_counts as count_zones
+from zones import ZoneIndex
+
+# Offline jobs started through the API, by job id
+offline_jobs = {}
+
+
+def probe_video(path):
+    """Return (width, height, fps, frame_count) of a video file, or None if it cannot be opened."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+    info = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            cap.get(cv2.CAP_PROP_FPS) or 0.0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    cap.release()
+    return info
+
+
+def analyze_video(path, zones, labels, stride=1, batch_size=None, progress=None, should_stop=None):
+    """Count people per zone on every ``stride``-th frame of ``path``.
+
+    ``progress(frames_done, frames_total)`` is called after each batch and
+    ``should_stop()`` is checked between batches. Returns a dict with the
+    video metadata and a ``series`` list of per-frame counts.
+    """
+    # Imported here so the CLI only pays for the model when it runs
+    from yolo_service import person_class_id, open_detection_cache, make_planner
+
+    stride = max(1, int(stride))
+    batch_size = max(1, int(batch_size or Config.INFERENCE_MAX_BATCH_SIZE))
+    grabber = FrameGrabber(path, live=False)
+    if not grabber.isOpened():
+        grabber.stop()
+        raise ValueError(f"Cannot open video: {path}")
+    frame_total = int(grabber.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = grabber.fps or 0.0
+    zone_index = ZoneIndex(zones, labels, grabber.width, grabber.height)
+    planner = make_planner(zone_index, grabber.width, grabber.height)
+    cached, cache_writer = open_detection_cache(path, frame_total, planner.key())
+    # With every wanted frame cached there is nothing to decode or infer
+    replay = cached is not None and cached.covers(range(0, frame_total, stride))
+    if replay:
+        grabber.stop()
+    else:
+        grabber.start()
+
+    series = []
+    cache_hits = 0
+    started = time.perf_counter()
+
+    def add_row(index, raw, cached_output=False):
+        # Cached output was class-filtered by the model already; replaying it must not need the model
+        dets = filter_detections(raw, None if cached_output else person_class_id(), Config.PERSON_CONF_THRESHOLD)
+        counts = count_zones(zone_index.membership(dets.xyxy))
+        series.append({
+            "frame": index,
+            "time": round(index / fps, 3) if fps else None,
+            "total": len(dets.conf),
+            "zones": dict(zip(labels, counts)),
+        })
+
+    def flush(batch):
+        nonlocal cache_hits
+        hits = [cached.get(captured.index) if cached is not None else None for captured in batch]
+        # Submitting the whole batch at once lets the scheduler run it as one call
+        futures = [planner.submit(captured.frame) if hit is None else None
+                   for captured, hit in zip(batch, hits)]
+        for captured, hit, future in zip(batch, hits, futures):
+            if hit is None:
+                raw = future.result()
+                if cache_writer is not None:
+                    cache_writer.add(captured.index, raw)
+                add_row(captured.index, raw)
+            else:
+                cache_hits += 1
+                add_row(captured.index, hit, cached_output=True)
+
+    stopped = False
+    next_index = 0
+    try:
+        if replay:
+            for next_index in range(0, frame_total, stride):
+                if should_stop is not None and should_stop():
+                    stopped = True
+                    break
+                add_row(next_index, cached.get(next_index), cached_output=True)
+                cache_hits += 1
+        else:
+            batch = []
+            while True:
+                if should_stop is not None and should_stop():
+                    stopped = True
+                    break
+                captured = grabber.read(min_index=next_index)
+                if captured is None:
+                    break
+                next_index = captured.index + stride
+                batch.append(captured)
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+                    if progress is not None:
+                        progress(next_index, frame_total)
+            if batch:
+                flush(batch)
+    finally:
+        grabber.stop()
+        if cache_writer is not None:
+            cache_writer.commit()
+
+    elapsed = time.perf_counter() - started
+    if progress is not None:
+        progress(next_index if stopped else frame_total, frame_total)
+    return {
+        "video": path,
+        "width": grabber.width,
+        "height": grabber.height,
+        "fps": fps,
+        "frame_count": frame_total,
+        "stride": stride,
+        "frames_analyzed": len(series),
+        "cache_hits": cache_hits,
+        "inference_plan": planner.stats(),
+        "elapsed_seconds": round(elapsed, 3),
+        "analysis_fps": round(len(series) / elapsed, 2) if elapsed > 0 else None,
+        "labels": list(labels),
+        "series": series,
+    }
+
+
+class OfflineJob:
+    """One background offline analysis run with progress reporting."""
+
+    def __init__(self, feed_id, path, zones, labels, stride=1, batch_size=None):
+        self.id = uuid.uuid4().hex
+        self.feed_id = feed_id
+        self.path = path
+        self.state = "queued"  # queued -> running -> done | failed | cancelled
+        self.frames_done = 0
+        self.frames_total = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.cancelled = False
+        self._args = (path, zones, labels, stride, batch_size)
+
+    def _progress(self, done, total):
+        self.frames_done, self.frames_total = min(done, total) if total else done, total
+
+    def _run(self):
+        self.state = "running"
+        try:
+            self.result = analyze_video(*self._args, progress=self._progress, should_stop=lambda: self.cancelled)
+            self.state = "cancelled" if self.cancelled else "done"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+        self.finished = time.time()
+
+    def start(self):
+        threading.Thread(target=self._run, name=f"offline-{self.id}", daemon=True).start()
+        return self
+
+    def status(self, include_result=False):
+        status = {
+            "id": self.id,
+            "feed_id": self.feed_id,
+            "state": self.state,
+            "frames_done": self.frames_done,
+            "frames_total": self.frames_total,
+            "progress": round(self.frames_done / self.frames_total, 4) if self.frames_total else 0.0,
+            "error": self.error,
+        }
+        if include_result:
+            status["result"] = self.result
+        return status
+
+
+def prune_offline_jobs(ttl=None, max_finished=None):
+    """Forget finished jobs older than ``ttl`` seconds and all but the ``max_finished`` most recent ones."""
+    ttl = Config.OFFLINE_JOB_TTL if ttl is None else ttl
+    max_finished = Config.OFFLINE_JOB_MAX_FINISHED if max_finished is None else max_finished
+    finished = sorted((job for job in list(offline_jobs.values()) if job.finished is not None),
+                      key=lambda job: job.finished, reverse=True)
+    cutoff = time.time() - ttl
+    for i, job in enumerate(finished):
+        if i >= max_finished or job.finished < cutoff:
+            offline_jobs.pop(job.id, None)
+
+
+def start_offline_job(feed_id, path, zones, labels, stride=1, batch_size=None):
+    prune_offline_jobs()
+    job = OfflineJob(feed_id, path, zones, labels, stride, batch_size)
+    offline_jobs[job.id] = job
+    return job.start()
+
+
+def write_csv(result, out):
+    writer = csv.writer(out)
+    writer.writerow(["frame", "time", "total"] + result["labels"])
+    for row in result["series"]:
+        writer.writerow([row["frame"], row["time"], row["total"]] + [row["zones"][label] for label in result["labels"]])
+
+
+def load_feed_zones(feed_id, width, height):
+    """A feed's saved zones scaled to ``width`` x ``height``, read without starting the web app.
+
+    Importing app.py would preload the model, start the count history writer
+    and run ``db.create_all()``; a bare Flask app bound to the same database only reads.
+    """
+    from flask import Flask
+    from helpers import scale_zones
+    from models import db, Zone
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = Config.SQLALCHEMY_DATABASE_URI
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        return scale_zones(Zone.query.filter_by(feed_id=feed_id).all(), width, height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="path to the video file")
+    parser.add_argument("--feed-id", type=int, help="use the zones saved for this feed")
+    parser.add_argument("--stride", type=int, default=1, help="analyse every Nth frame")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--out", help="output file (.csv or .json); JSON to stdout if omitted")
+    args = parser.parse_args()
+
+    info = probe_video(args.video)
+    if info is None:
+        parser.error(f"cannot open video: {args.video}")
+    width, height = info[:2]
+
+    zones, labels = [], []
+    if args.feed_id is not None:
+        zones, labels = load_feed_zones(args.feed_id, width, height)
+
+    def report(done, total):
+        print(f"\r{done}/{total} frames", end="", file=sys.stderr, flush=True)
+
+    result = analyze_video(args.video, zones, labels, args.stride, args.batch_size, progress=report)
+    print(f"\n{result['frames_analyzed']} frames in {result['elapsed_seconds']}s "
+          f"({result['analysis_fps']} fps)", file=sys.stderr)
+
+    if args.out and args.out.endswith(".csv"):
+        with open(args.out, "w", newline="") as f:
+            write_csv(result, f)
+    elif args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f)
+    else:
+        json.dump(result, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
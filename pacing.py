@@ -0,0 +1,79 @@
+import time
+
+# Fraction of idle time kept on top of the measured work time once a feed cannot
+# reach its target rate, so a saturated host still has room for other feeds.
+BACKOFF_HEADROOM = 0.25
+
+
+class FramePacer:
+    """Paces one feed's analysis loop.
+
+    Call ``begin()`` when a frame starts and ``wait()`` once it is finished.
+    ``wait()`` sleeps only for what is left of the frame interval after the work
+    time. When the smoothed work time no longer fits in the interval the pacer
+    backs off to ``work * (1 + BACKOFF_HEADROOM)`` and recovers by itself once
+    the load drops.
+
+    For video files ``source_index()`` gives the frame that should be on screen
+    according to the file's native frame rate, so the loop can skip ahead and
+    keep real-time playback. With ``realtime=False`` (offline mode) nothing is
+    skipped and the loop never sleeps.
+    """
+
+    def __init__(self, target_fps=0, native_fps=0.0, realtime=True, smoothing=0.1):
+        self.target_fps = target_fps or 0
+        self.native_fps = native_fps or 0.0
+        self.realtime = realtime
+        self.smoothing = smoothing
+        self.interval = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+        self.effective_interval = self.interval
+        self.work_time = 0.0
+        self.achieved_fps = 0.0
+        self.frames = 0
+        self.saturated = False
+        self._started = None
+        self._frame_started = None
+
+    def source_index(self):
+        """Index of the source frame that is due now (0 when not pacing a file in real time)."""
+        if not self.realtime or not self.native_fps or self._started is None:
+            return 0
+        return int((time.monotonic() - self._started) * self.native_fps)
+
+    def begin(self):
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        if self._frame_started is not None:
+            period = now - self._frame_started
+            if period > 0:
+                fps = 1.0 / period
+                self.achieved_fps = fps if self.frames == 1 else self.achieved_fps + self.smoothing * (fps - self.achieved_fps)
+        self._frame_started = now
+        self.frames += 1
+
+    def wait(self):
+        """Sleep for the rest of the frame interval, net of the time the frame took."""
+        if self._frame_started is None:
+            return
+        work = time.monotonic() - self._frame_started
+        self.work_time = work if self.frames == 1 else self.work_time + self.smoothing * (work - self.work_time)
+        if not self.realtime or not self.interval:
+            return
+
+        backoff = self.work_time * (1 + BACKOFF_HEADROOM)
+        self.saturated = backoff > self.interval
+        self.effective_interval = max(self.interval, backoff)
+        remaining = self.effective_interval - work
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def stats(self):
+        return {
+            "target_fps": self.target_fps,
+            "effective_fps": round(1.0 / self.effective_interval, 2) if self.effective_interval else 0.0,
+            "achieved_fps": round(self.achieved_fps, 2),
+            "work_ms": round(self.work_time * 1000, 2),
+            "saturated": self.saturated,
+            "realtime": self.realtime,
+        }
@@ -0,0 +1,113 @@
+import struct
+import numpy as np
+from collections import namedtuple
+
+# Compact per-frame detections: xyxy (N, 4) float32, conf (N,) float32, cls (N,) int32
+Detections = namedtuple("Detections", ["xyxy", "conf", "cls"])
+
+
+def empty_detections():
+    return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32))
+
+
+def _to_numpy(values):
+    """Accept torch tensors (moved to host) as well as plain arrays."""
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+def from_result(result):
+    """Convert one ultralytics ``Results`` object into ``Detections`` arrays."""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty_detections()
+    return Detections(
+        _to_numpy(boxes.xyxy).astype(np.float32).reshape(-1, 4),
+        _to_numpy(boxes.conf).astype(np.float32).reshape(-1),
+        _to_numpy(boxes.cls).astype(np.int32).reshape(-1),
+    )
+
+
+def filter_detections(dets, class_id, conf_threshold=0.0):
+    """Keep only boxes of ``class_id`` (any class if None) with confidence >= ``conf_threshold`` in one mask."""
+    keep = dets.conf >= conf_threshold
+    if class_id is not None:
+        keep &= dets.cls == class_id
+    return Detections(dets.xyxy[keep], dets.conf[keep], dets.cls[keep])
+
+
+def centroids(xyxy):
+    """Integer box centres, (N, 2), matching ``int((x1 + x2) / 2)`` for pixel boxes."""
+    xyxy = np.asarray(xyxy)
+    cx = ((xyxy[:, 0] + xyxy[:, 2]) / 2).astype(np.int32)
+    cy = ((xyxy[:, 1] + xyxy[:, 3]) / 2).astype(np.int32)
+    return np.stack([cx, cy], axis=1)
+
+
+def box_iou(a, b):
+    """Pairwise IoU of two sets of xyxy boxes, (N, M)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    inter_w = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = inter_w * inter_h
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def zone_counts(membership):
+    """Per-zone person counts as a list of ints (column sum of the membership matrix)."""
+    return membership.sum(axis=0).astype(int).tolist()
+
+
+# What a feed reports for one frame: xyxy (N, 4) int boxes, track_ids (list of N
+# or None when tracking is off) and conf ((N,) float32 or None when unknown)
+FeedDetections = namedtuple("FeedDetections", ["xyxy", "track_ids", "conf"])
+
+# Binary detections layout (little-endian): magic, version, count, flags, then
+# int32 xyxy[count * 4], int32 track_ids[count] if flagged, float32 conf[count] if flagged
+PACKED_MAGIC = b"DET1"
+PACKED_HEADER = struct.Struct("<4sQIB")
+PACKED_HAS_TRACK_IDS = 1
+PACKED_HAS_CONF = 2
+
+
+def empty_feed_detections():
+    return FeedDetections(np.zeros((0, 4), np.int32), None, None)
+
+
+def detections_to_dicts(dets):
+    """The original list-of-dicts form: one ``{"bbox", "label", ...}`` per person."""
+    rows = []
+    for i, bbox in enumerate(dets.xyxy.tolist()):
+        row = {"bbox": bbox, "label": "person"}
+        if dets.track_ids is not None:
+            row["track_id"] = dets.track_ids[i]
+        if dets.conf is not None:
+            row["confidence"] = float(dets.conf[i])
+        rows.append(row)
+    return rows
+
+
+def detections_to_columns(dets):
+    """Columnar form: flat bbox list (x1, y1, x2, y2 per person) plus parallel id/confidence lists."""
+    return {
+        "count": len(dets.xyxy),
+        "bbox": dets.xyxy.reshape(-1).tolist(),
+        "track_id": list(dets.track_ids) if dets.track_ids is not None else None,
+        "confidence": np.round(dets.conf, 4).tolist() if dets.conf is not None else None,
+    }
+
+
+def pack_detections(dets, version=0):
+    """Pack detections into the binary layout described by PACKED_HEADER."""
+    flags = (PACKED_HAS_TRACK_IDS if dets.track_ids is not None else 0) | (PACKED_HAS_CONF if dets.conf is not None else 0)
+    parts = [PACKED_HEADER.pack(PACKED_MAGIC, version, len(dets.xyxy), flags),
+             np.ascontiguousarray(dets.xyxy, dtype="<i4").tobytes()]
+    if dets.track_ids is not None:
+        parts.append(np.array([int(t) for t in dets.track_ids], dtype="<i4").tobytes())
+    if dets.conf is not None:
+        parts.append(np.ascontiguousarray(dets.conf, dtype="<f4").tobytes())
+    return b"".join(parts)
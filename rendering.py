@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+
+BOX_COLOR = (255, 0, 0)  # Blue (BGR format)
+ZONE_COLOR = (0, 255, 0)  # Green
+
+
+class FrameRenderer:
+    """Annotates and JPEG-encodes frames for one feed's stream.
+
+    Frames wider than ``max_width`` are downscaled before drawing and encoding,
+    into a buffer that is reused from frame to frame, so the captured frame is
+    never modified and a large source does not pay full-resolution draw/encode.
+    """
+
+    def __init__(self, max_width=0, quality=80):
+        self.max_width = int(max_width or 0)
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+        self._buffer = None
+
+    def _canvas(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.max_width / width if 0 < self.max_width < width else 1.0
+        size = (int(round(width * scale)), int(round(height * scale)))
+        if self._buffer is None or self._buffer.shape[:2] != (size[1], size[0]):
+            self._buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        if scale < 1.0:
+            cv2.resize(frame, size, dst=self._buffer, interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(self._buffer, frame)
+        return self._buffer, scale
+
+    def draw(self, frame, boxes, track_ids=None, zone_index=None):
+        """Draw person boxes and zones on a (scaled) copy of ``frame`` and return the copy."""
+        canvas, scale = self._canvas(frame)
+        scaled = (np.asarray(boxes).reshape(-1, 4) * scale).astype(int).tolist()
+        for i, (x1, y1, x2, y2) in enumerate(scaled):
+            label = f"Person {track_ids[i]}" if track_ids is not None else "Person"
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), BOX_COLOR, 2)
+            cv2.putText(canvas, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, BOX_COLOR, 2)
+        if zone_index is not None:
+            zone_index.draw(canvas, ZONE_COLOR, scale=scale)
+        return canvas
+
+    def encode(self, canvas):
+        _, buffer = cv2.imencode('.jpg', canvas, self.params)
+        return buffer.tobytes()
+
+    def render(self, frame, boxes, track_ids=None, zone_index=None):
+        """Draw person boxes and zones on a (scaled) copy of ``frame`` and return JPEG bytes."""
+        return self.encode(self.draw(frame, boxes, track_ids, zone_index))
@@ -0,0 +1,39 @@
+import time
+
+# Stages of one analysed frame, in pipeline order
+STAGES = ("decode", "inference", "postprocess", "tracking", "zones", "publish", "drawing", "encode")
+
+
+class StageTimer:
+    """Lap timer for the stages of one feed's frame loop.
+
+    ``begin()`` starts a frame and ``lap(stage)`` charges the time since the
+    previous lap to ``stage``. Totals and counts are kept per stage so means
+    stay comparable between runs; ``last`` holds the laps of the current frame.
+    """
+
+    def __init__(self):
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self.counts = dict.fromkeys(STAGES, 0)
+        self.last = {}
+        self.started = 0.0
+        self._mark = 0.0
+
+    def begin(self):
+        self.last = {}
+        self.started = self._mark = time.perf_counter()
+
+    def add(self, stage, seconds):
+        """Charge ``seconds`` measured elsewhere (e.g. on the capture thread) to ``stage``."""
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+        self.last[stage] = seconds
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.add(stage, now - self._mark)
+        self._mark = now
+
+    def mean_ms(self):
+        return {stage: round(self.totals[stage] / self.counts[stage] * 1000, 3)
+                for stage in self.totals if self.counts[stage]}
@@ -444,26 +444,26 @@ function drawTempRectangle() {
   function drawZones(context, color = 'lime', showCount = false) {
     zones.forEach(zone => {
       const coords = zone.coordinates;
+      // Free-form polygon zones carry a points list, editor rectangles carry named corners
+      const points = coords.points || [coords.topleft, coords.topright, coords.bottomright, coords.bottomleft];
       context.strokeStyle = color;
       context.lineWidth = 2;
       context.beginPath();
-      context.moveTo(coords.topleft[0], coords.topleft[1]);
-      context.lineTo(coords.topright[0], coords.topright[1]);
-      context.lineTo(coords.bottomright[0], coords.bottomright[1]);
-      context.lineTo(coords.bottomleft[0], coords.bottomleft[1]);
+      context.moveTo(points[0][0], points[0][1]);
+      points.slice(1).forEach(p => context.lineTo(p[0], p[1]));
       context.closePath();
       context.stroke();
 
       // Label
       context.fillStyle = color;
       context.font = '16px Arial';
-      context.fillText(zone.label, coords.topleft[0], coords.topleft[1] - 5);
+      context.fillText(zone.label, points[0][0], points[0][1] - 5);
 
       // Count (if requested and available)
       if (showCount && crowdCounts[zone.label] !== undefined) {
         context.fillStyle = 'red';
         context.font = '20px Arial';
-        context.fillText(`${crowdCounts[zone.label]}`, coords.topleft[0], coords.topleft[1] - 30);
+        context.fillText(`${crowdCounts[zone.label]}`, points[0][0], points[0][1] - 30);
       }
     });
   }
@@ -2,6 +2,7 @@
 // This script handles real-time updates for the analysis preview tab
 
 let tabAnalysisInterval = null;
+let tabLatestCounts = null; // Latest counts pushed by the analysis event stream
 let tabCrowdCounts = {};
 let tabTotalCounts = [];
 let tabZoneCountsHistory = {};
@@ -32,12 +33,18 @@ function initTabAnalysisPreview(feedId) {
   initCurveChart();
   // initTrendChart();
 
-  // Start polling for live data
+  // Charts advance once per second from the latest pushed counts, no polling requests
+  tabLatestCounts = null;
   tabAnalysisInterval = setInterval(() => {
     updateTabAnalysisData(feedId);
   }, 1000);
 }
 
+// Keep the most recent counts for this feed from the shared event stream
+window.addEventListener("analysisupdate", (event) => {
+  tabLatestCounts = event.detail.counts || null;
+});
+
 // Stop updates when leaving the tab
 function stopTabAnalysisPreview() {
   if (tabAnalysisInterval) {
@@ -49,9 +56,9 @@ function stopTabAnalysisPreview() {
 // Fetch and update data
 async function updateTabAnalysisData(feedId) {
   try {
-    // Fetch counts
-    const countsResp = await fetch(`/api/feeds/${feedId}/counts`);
-    const counts = await countsResp.json();
+    // Nothing pushed yet (analysis still starting)
+    if (!tabLatestCounts) return;
+    const counts = tabLatestCounts;
 
     tabCrowdCounts = counts.zones || {};
     const total = counts.total || 0;
@@ -1,5 +1,5 @@
 // Globals for YOLO analysis
-let countInterval = null;
+let countEvents = null; // EventSource pushing count/detection updates
 let crowdCounts = {};
 let analysisStarted = false;
 let deepsortEnabled = false; // Track deepsort toggle state
@@ -63,18 +63,24 @@ if (generateReportBtn) {
 
   
 
-  // Start polling backend for counts and detections
-  countInterval = setInterval(async () => {
-    const resp = await fetch(`/api/feeds/${feedId}/counts`);
-    const counts = await resp.json();
-    crowdCounts = counts.zones || {};
+  // Subscribe to pushed count/detection updates (EventSource reconnects by itself).
+  // Updates are throttled server-side to at most two per second for the dashboard.
+  countEvents = new EventSource(`/api/feeds/${feedId}/events?interval=0.5`);
+  countEvents.addEventListener("update", (event) => {
+    const update = JSON.parse(event.data);
+    handleAnalysisUpdate(update.counts || {}, update.detections || []);
+    // Share the update with other views (e.g. the analysis preview tab)
+    window.dispatchEvent(new CustomEvent("analysisupdate", { detail: update }));
+  });
 
-    const detResp = await fetch(`/api/feeds/${feedId}/detections`);
-    const detections = await detResp.json();
+  // Start tab analysis preview if available
+  if (window.initTabAnalysisPreview) {
+    window.initTabAnalysisPreview(feedId);
+  }
+}
 
-    console.log("Counts received:", counts);
-    console.log("Crowd counts:", crowdCounts);
-    console.log("Current zones:", zones.map(z => z.label));
+function handleAnalysisUpdate(counts, detections) {
+    crowdCounts = counts.zones || {};
 
     // Update counts in DOM
     const videoCountP = document.getElementById("videoCount");
@@ -118,12 +124,6 @@ if (generateReportBtn) {
       const loadingDiv = document.getElementById("analysisLoading");
       if (loadingDiv) loadingDiv.style.display = "none";
     }
-  }, 1000);
-
-  // Start tab analysis preview if available
-  if (window.initTabAnalysisPreview) {
-    window.initTabAnalysisPreview(feedId);
-  }
 }
 
 async function stopYoloAnalysis(feedId) {
@@ -131,8 +131,10 @@ async function stopYoloAnalysis(feedId) {
 
 
 
-  clearInterval(countInterval);
-  countInterval = null;
+  if (countEvents) {
+    countEvents.close();
+    countEvents = null;
+  }
 
   await fetch(`/api/feeds/${feedId}/stop_analysis`, { method: "POST" });
 
@@ -0,0 +1,171 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import time
+from collections import deque
+
+from config import Config
+
+# Logger of the analysis pipeline; per-feed loggers are its "crowd.feed.<id>" children
+logger = logging.getLogger("crowd")
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener unformatted, so formatting happens off the frame loop.
+
+    Safe because the pipeline only logs with immutable or per-frame arguments.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _start_listener():
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    logger.setLevel(Config.LOG_LEVEL)
+    logger.propagate = False
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+listener = _start_listener()
+
+# Per-feed overrides set through the API, applied whenever the feed's log is (re)created
+feed_log_settings = {}
+feed_logs = {}
+span_buffers = {}
+
+
+class FeedLog:
+    """Sampled, rate-limited logging for one feed.
+
+    Per-frame messages (``frame()``) are DEBUG; only every ``sample_every``-th
+    frame is considered and at most ``rate`` of them per second pass (token
+    bucket), the rest are counted in ``suppressed``. Level, sampling and rate
+    are checked before anything is formatted. Lifecycle messages (``info()``,
+    ``warning()``) are only subject to the level. Setting ``level`` on one feed
+    turns on its frame log without touching the others.
+    """
+
+    def __init__(self, feed_id, level=None, sample_every=None, rate=None):
+        self.logger = logger.getChild(f"feed.{feed_id}")
+        self.suppressed = 0
+        self.configure(level, sample_every, rate)
+
+    def configure(self, level=None, sample_every=None, rate=None):
+        self.logger.setLevel(level or logging.NOTSET)
+        self.sample_every = max(1, int(sample_every or Config.FEED_LOG_SAMPLE_EVERY))
+        self.rate = float(rate or Config.FEED_LOG_RATE)
+        self.tokens = self.rate
+        self._refilled = time.monotonic()
+
+    def _allow(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.suppressed += 1
+        return False
+
+    def log(self, level, msg, *args):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, msg, *args)
+
+    def debug(self, msg, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(logging.INFO, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(logging.WARNING, msg, *args)
+
+    def exception(self, msg, *args):
+        """ERROR with the current exception's traceback."""
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.logger.exception(msg, *args)
+
+    def frame(self, frame_no, msg, *args):
+        if frame_no % self.sample_every == 0 and self.logger.isEnabledFor(logging.DEBUG) and self._allow():
+            self.logger.debug(msg, *args)
+
+    def settings(self):
+        return {"level": logging.getLevelName(self.logger.getEffectiveLevel()),
+                "sample_every": self.sample_every, "rate": self.rate, "suppressed": self.suppressed}
+
+
+def feed_log(feed_id):
+    log = feed_logs.get(feed_id)
+    if log is None:
+        log = feed_logs[feed_id] = FeedLog(feed_id, **feed_log_settings.get(feed_id, {}))
+    return log
+
+
+def configure_feed_log(feed_id, level=None, sample_every=None, rate=None):
+    """Override logging for one feed; takes effect immediately, also on a running feed."""
+    settings = feed_log_settings.setdefault(feed_id, {})
+    if level is not None:
+        settings["level"] = logging.getLevelName(str(level).upper())
+        if not isinstance(settings["level"], int):
+            raise ValueError(f"Unknown log level: {level}")
+    if sample_every is not None:
+        settings["sample_every"] = int(sample_every)
+    if rate is not None:
+        settings["rate"] = float(rate)
+    log = feed_log(feed_id)
+    log.configure(**settings)  # in place, running loops hold on to their FeedLog
+    return log.settings()
+
+
+class SpanBuffer:
+    """Stage laps of the last ``capacity`` analysed frames of one feed.
+
+    Recording is a single deque append per frame, so it stays on in
+    production; ``chrome_trace()`` turns the buffer into Chrome trace-event
+    JSON (load it in chrome://tracing or Perfetto).
+    """
+
+    def __init__(self, capacity):
+        self.frames = deque(maxlen=capacity)
+
+    def record(self, frame_no, started, laps):
+        """``laps`` is a StageTimer's ``last``: stage -> seconds, in pipeline order."""
+        self.frames.append((frame_no, started, tuple(laps.items())))
+
+    def chrome_trace(self, feed_id):
+        pid = feed_id
+        events = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"feed {feed_id}"}},
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": 1, "args": {"name": "analysis"}},
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": 2, "args": {"name": "capture"}},
+        ]
+        for frame_no, started, laps in list(self.frames):
+            ts = started * 1e6
+            total = sum(seconds for stage, seconds in laps if stage != "decode") * 1e6
+            events.append({"name": f"frame {frame_no}", "ph": "X", "pid": pid, "tid": 1,
+                           "ts": round(ts, 1), "dur": round(total, 1)})
+            for stage, seconds in laps:
+                dur = seconds * 1e6
+                if stage == "decode":
+                    # Decoded on the capture thread just before the frame was picked up
+                    events.append({"name": stage, "ph": "X", "pid": pid, "tid": 2,
+                                   "ts": round(started * 1e6 - dur, 1), "dur": round(dur, 1)})
+                    continue
+                events.append({"name": stage, "ph": "X", "pid": pid, "tid": 1,
+                               "ts": round(ts, 1), "dur": round(dur, 1), "args": {"frame": frame_no}})
+                ts += dur
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def span_buffer(feed_id, reset=False):
+    if reset or feed_id not in span_buffers:
+        span_buffers[feed_id] = SpanBuffer(Config.TRACE_BUFFER_FRAMES)
+    return span_buffers[feed_id]
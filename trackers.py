@@ -0,0 +1,254 @@
+import numpy as np
+
+from postprocess import box_iou
+from tracing import logger
+
+try:
+    from deep_sort_realtime.deepsort_tracker import DeepSort
+    deepsort_available = True
+except ImportError:
+    deepsort_available = False
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+    logger.warning("scipy not available, tracks are matched to detections greedily instead of optimally")
+
+TRACKERS = ("bytetrack", "deepsort")
+
+
+class DeepSortTracker:
+    """Adapter giving DeepSort the pipeline's array interface.
+
+    ``update()`` takes a frame's boxes (N x 4 xyxy) and confidences and returns
+    ``(track_ids, boxes)`` of the confirmed tracks; ``predict()`` advances the
+    tracks by one frame without detections, for frames the detector skipped.
+    With an ``embedder`` (embedding.FeedEmbedder) the appearance embeddings
+    come from it instead of DeepSort's own per-frame embedder.
+    """
+
+    name = "deepsort"
+
+    def __init__(self, max_age=30, n_init=1, embedder=None):
+        self.embedder = embedder
+        if embedder is None:
+            self.tracker = DeepSort(max_age=max_age, n_init=n_init)
+        else:
+            self.tracker = DeepSort(max_age=max_age, n_init=n_init, embedder=None)
+
+    def _confirmed(self, tracks):
+        confirmed = [track for track in tracks if track.is_confirmed()]
+        boxes = np.array([track.to_ltrb() for track in confirmed], dtype=float).reshape(-1, 4).astype(int)
+        return [track.track_id for track in confirmed], boxes
+
+    def update(self, boxes, confs, frame):
+        boxes = np.asarray(boxes).reshape(-1, 4)
+        confs = np.asarray(confs).reshape(-1)
+        # DeepSort drops empty boxes itself, which would misalign the embeddings
+        valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        boxes, confs = boxes[valid], confs[valid]
+        detections = [[[x1, y1, x2 - x1, y2 - y1], conf, "person"]
+                      for (x1, y1, x2, y2), conf in zip(boxes.tolist(), confs.tolist())]
+        if self.embedder is None:
+            return self._confirmed(self.tracker.update_tracks(detections, frame=frame))
+        embeds = list(self.embedder.embed(frame, boxes))
+        return self._confirmed(self.tracker.update_tracks(detections, embeds=embeds, frame=frame))
+
+    def predict(self, frame):
+        if self.embedder is None:
+            return self._confirmed(self.tracker.update_tracks([], frame=frame))
+        return self._confirmed(self.tracker.update_tracks([], embeds=[], frame=frame))
+
+
+def match_iou(iou, threshold):
+    """Assign rows to columns maximising total IoU, keeping pairs with IoU >= ``threshold``.
+
+    Optimal with SciPy, greedy by descending IoU without it. Returns
+    ``(rows, cols)`` index arrays.
+    """
+    if not iou.size:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(np.where(iou >= threshold, 1.0 - iou, 1e6))
+        keep = iou[rows, cols] >= threshold
+        return rows[keep], cols[keep]
+    rows, cols = [], []
+    used_rows = np.zeros(iou.shape[0], dtype=bool)
+    used_cols = np.zeros(iou.shape[1], dtype=bool)
+    for flat in np.argsort(-iou, axis=None):
+        r, c = divmod(int(flat), iou.shape[1])
+        if iou[r, c] < threshold:
+            break
+        if not used_rows[r] and not used_cols[c]:
+            used_rows[r] = used_cols[c] = True
+            rows.append(r)
+            cols.append(c)
+    return np.array(rows, dtype=int), np.array(cols, dtype=int)
+
+
+class KalmanBoxes:
+    """Constant-velocity Kalman filter over all tracks at once.
+
+    State per track is (cx, cy, aspect, height) and their velocities, held in
+    one (N, 8) mean and one (N, 8, 8) covariance array; noise scales with the
+    box height, as in SORT/DeepSort.
+    """
+
+    std_position = 1 / 20
+    std_velocity = 1 / 160
+
+    def __init__(self):
+        self.mean = np.zeros((0, 8))
+        self.cov = np.zeros((0, 8, 8))
+        self.motion = np.eye(8)
+        self.motion[:4, 4:] = np.eye(4)
+
+    @staticmethod
+    def to_xyah(boxes):
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        w = boxes[:, 2] - boxes[:, 0]
+        h = np.maximum(boxes[:, 3] - boxes[:, 1], 1e-3)
+        return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w / h, h], axis=1)
+
+    def boxes(self):
+        cx, cy, a, h = self.mean[:, :4].T
+        w = a * h
+        return np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+    @staticmethod
+    def _noise(h, stds):
+        """(N, k, k) diagonal covariances; entries of ``stds`` are relative to the box height, or absolute if negative."""
+        stds = np.asarray(stds, dtype=float)
+        scaled = np.where(stds >= 0, np.outer(h, np.abs(stds)), np.abs(stds))
+        cov = np.zeros((len(h), len(stds), len(stds)))
+        idx = np.arange(len(stds))
+        cov[:, idx, idx] = scaled ** 2
+        return cov
+
+    def add(self, boxes):
+        z = self.to_xyah(boxes)
+        mean = np.concatenate([z, np.zeros_like(z)], axis=1)
+        p, v = self.std_position, self.std_velocity
+        cov = self._noise(z[:, 3], [2 * p, 2 * p, -1e-2, 2 * p, 10 * v, 10 * v, -1e-5, 10 * v])
+        self.mean = np.concatenate([self.mean, mean])
+        self.cov = np.concatenate([self.cov, cov])
+
+    def keep(self, mask):
+        self.mean = self.mean[mask]
+        self.cov = self.cov[mask]
+
+    def predict(self):
+        if not len(self.mean):
+            return
+        p, v = self.std_position, self.std_velocity
+        noise = self._noise(self.mean[:, 3], [p, p, -1e-2, p, v, v, -1e-5, v])
+        self.mean = self.mean @ self.motion.T
+        self.cov = self.motion @ self.cov @ self.motion.T + noise
+
+    def update(self, index, boxes):
+        """Correct tracks ``index`` with their matched boxes."""
+        if not len(index):
+            return
+        z = self.to_xyah(boxes)
+        mean, cov = self.mean[index], self.cov[index]
+        p = self.std_position
+        innovation_cov = cov[:, :4, :4] + self._noise(mean[:, 3], [p, p, -1e-1, p])
+        # K^T = S^-1 H P, as S is symmetric
+        gain = np.linalg.solve(innovation_cov, cov[:, :4, :]).transpose(0, 2, 1)
+        self.mean[index] = mean + (gain @ (z - mean[:, :4])[:, :, None])[:, :, 0]
+        self.cov[index] = cov - gain @ innovation_cov @ gain.transpose(0, 2, 1)
+
+
+class ByteTracker:
+    """Motion-only tracker in the style of SORT/ByteTrack, no appearance model.
+
+    Every frame all tracks are advanced by one batched Kalman prediction,
+    then matched to the detections by IoU: confident detections
+    (``conf >= high_threshold``) first against every track, the remaining
+    low-confidence ones against the tracks still unmatched. Unmatched
+    confident detections start new tracks, which are reported after
+    ``n_init`` hits; tracks unmatched for ``max_age`` frames are dropped.
+    Same interface as DeepSortTracker; only tracks matched on the last
+    update are returned.
+    """
+
+    name = "bytetrack"
+
+    def __init__(self, max_age=30, n_init=1, high_threshold=0.5, match_iou=0.2, low_match_iou=0.5):
+        self.max_age = max_age
+        self.n_init = n_init
+        self.high_threshold = high_threshold
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.kalman = KalmanBoxes()
+        self.ids = np.zeros(0, dtype=int)
+        self.hits = np.zeros(0, dtype=int)
+        self.missed = np.zeros(0, dtype=int)  # frames since the last match
+        self.active = np.zeros(0, dtype=bool)  # matched on the last update
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _output(self):
+        shown = self.active & (self.hits >= self.n_init)
+        return self.ids[shown].tolist(), np.round(self.kalman.boxes()[shown]).astype(int).reshape(-1, 4)
+
+    def _age(self, matched=()):
+        self.missed += 1
+        self.missed[matched] = 0
+        alive = self.missed <= self.max_age
+        if not alive.all():
+            self.kalman.keep(alive)
+            self.ids, self.hits = self.ids[alive], self.hits[alive]
+            self.missed, self.active = self.missed[alive], self.active[alive]
+
+    def update(self, boxes, confs, frame=None):
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        confs = np.asarray(confs, dtype=float).reshape(-1)
+        self.kalman.predict()
+        predicted = self.kalman.boxes()
+
+        high = np.flatnonzero(confs >= self.high_threshold)
+        low = np.flatnonzero(confs < self.high_threshold)
+        rows, cols = match_iou(box_iou(predicted, boxes[high]), self.match_iou)
+        matched_tracks, matched_dets = rows, high[cols]
+
+        free = np.setdiff1d(np.arange(len(self.ids)), rows)
+        rows, cols = match_iou(box_iou(predicted[free], boxes[low]), self.low_match_iou)
+        matched_tracks = np.concatenate([matched_tracks, free[rows]])
+        matched_dets = np.concatenate([matched_dets, low[cols]])
+
+        self.kalman.update(matched_tracks, boxes[matched_dets])
+        self.hits[matched_tracks] += 1
+        self.active[:] = False
+        self.active[matched_tracks] = True
+        self._age(matched_tracks)
+
+        new = np.setdiff1d(high, high[np.isin(high, matched_dets)])
+        if len(new):
+            self.kalman.add(boxes[new])
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + len(new))])
+            self.next_id += len(new)
+            self.hits = np.concatenate([self.hits, np.ones(len(new), dtype=int)])
+            self.missed = np.concatenate([self.missed, np.zeros(len(new), dtype=int)])
+            self.active = np.concatenate([self.active, np.ones(len(new), dtype=bool)])
+        return self._output()
+
+    def predict(self, frame=None):
+        """Advance the tracks without detections; returns the tracks active at the last update."""
+        self.kalman.predict()
+        self._age()
+        return self._output()
+
+
+def create_tracker(kind, max_age=30, n_init=1, embedder=None):
+    """New tracker of ``kind`` (one of ``TRACKERS``); ``embedder`` is only used by DeepSort."""
+    if kind == "bytetrack":
+        return ByteTracker(max_age=max_age, n_init=n_init)
+    if kind == "deepsort":
+        if not deepsort_available:
+            raise ValueError("DeepSort is not installed")
+        return DeepSortTracker(max_age=max_age, n_init=n_init, embedder=embedder)
+    raise ValueError(f"tracker must be one of {', '.join(TRACKERS)}")
@@ -1,266 +1,634 @@
+import atexit
 import cv2
 import threading
 import time
-import queue
-import base64
+import json
 import numpy as np
-from ultralytics import YOLO
-import time
-
-try:
-    from deep_sort_realtime.deepsort_tracker import DeepSort
-    deepsort_available = True
-except ImportError:
-    deepsort_available = False
-    print("DeepSort not available, running without tracking")
-
-
-start = time.time()
-model = YOLO("yolov8n.pt")
-print("YOLO model loaded in", time.time() - start, "seconds")
+from config import Config
+from detector import model_registry, run_model_batch
+from inference_scheduler import InferenceScheduler
+from inference_workers import ProcessInferencePool
+from postprocess import (filter_detections, zone_counts as count_zones,
+                         FeedDetections, empty_feed_detections, detections_to_dicts)
+from zones import ZoneIndex
+from zone_cache import zone_cache
+from capture import FrameGrabber
+from pacing import FramePacer
+from broadcaster import FrameBroadcaster, ResultNotifier
+from rendering import FrameRenderer
+from stage_timer import StageTimer, STAGES
+import metrics
+from count_history import count_history
+from detection_cache import DetectionCache
+from tracing import logger, feed_log, span_buffer
+from motion_gate import MotionGate
+from keyframes import KeyframeScheduler
+from inference_planner import InferencePlanner, PLAN_MODES
+from inference_tuner import LatencyTuner, tuning_steps
+from trackers import TRACKERS, create_tracker, deepsort_available
+from embedding import CropEmbedder, FeedEmbedder
+
+if not deepsort_available:
+    logger.info("DeepSort not available, tracking uses ByteTrack")
+
+
+def person_class_id():
+    # In process mode the weights live in the workers, which report their class ids
+    if inference_pool:
+        return inference_pool.class_id("person")
+    return model_registry.class_id("person")
+
+# In "process" mode batches run in worker processes fed through shared memory,
+# keeping inference off the web server's GIL
+inference_pool = None
+if Config.INFERENCE_MODE == "process":
+    inference_pool = ProcessInferencePool(Config.INFERENCE_WORKERS, Config.INFERENCE_MAX_BATCH_SIZE,
+                                          Config.INFERENCE_SHM_SLOT_BYTES)
+    atexit.register(inference_pool.stop)  # unlinks the shared-memory frame slots
+
+def record_batch(n_frames, seconds):
+    metrics.inference_batch_size.labels().observe(n_frames)
+    metrics.inference_batch_seconds.labels().observe(seconds)
+
+# One scheduler shared by every feed so concurrent frames are batched together
+scheduler = InferenceScheduler(
+    inference_pool.run_batch if inference_pool else run_model_batch,
+    max_batch_size=Config.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=Config.INFERENCE_MAX_WAIT_MS,
+    workers=inference_pool.n_workers if inference_pool else 1,
+    on_batch=record_batch,
+)
+
+# Appearance embeddings for DeepSort, batched across feeds like the detector
+embed_scheduler = InferenceScheduler(
+    CropEmbedder(Config.EMBED_MAX_BATCH_SIZE, gpu=Config.EMBEDDER_GPU),
+    max_batch_size=Config.EMBED_MAX_BATCH_SIZE,
+    max_wait_ms=Config.EMBED_MAX_WAIT_MS,
+    name="embedding",
+)
+
+# On-disk cache of raw detections for video files
+detection_cache = None
+if Config.DETECTION_CACHE_ENABLED:
+    detection_cache = DetectionCache(Config.DETECTION_CACHE_DIR, Config.DETECTION_CACHE_MAX_MB * 1024 * 1024)
+
+def open_detection_cache(video_source, frame_count, plan=None, kwargs=None):
+    """Return ``(cached entry or None, writer)`` for a video file, ``(None, None)`` if caching does not apply.
+
+    ``plan`` is ``InferencePlanner.key()``, ``kwargs`` the feed's ``model_kwargs()``.
+    """
+    if detection_cache is None or not isinstance(video_source, str) or frame_count <= 0:
+        return None, None
+    # Everything that changes the raw model output belongs in the key
+    kwargs = dict(kwargs or {})
+    model = kwargs.pop("model", Config.YOLO_MODEL)
+    settings = {"classes": ["person"]}
+    if plan is not None:
+        settings["plan"] = plan
+    if kwargs:
+        settings["model_kwargs"] = kwargs
+    key = detection_cache.key(video_source, model, settings)
+    return detection_cache.open(key), detection_cache.writer(key, frame_count)
+
+def feed_zone_index(feed_id, width, height):
+    """The feed's cached zones at this resolution (no zones if they were never loaded)."""
+    return zone_cache.index(feed_id, width, height) or ZoneIndex([], [], width, height)
+
+def make_planner(zone_index, width, height, mode=None):
+    """InferencePlanner for one feed's resolution and zones, submitting to the shared scheduler."""
+    return InferencePlanner(scheduler.submit, zone_index, width, height, mode or Config.INFERENCE_PLAN,
+                            imgsz=Config.INFERENCE_IMGSZ, tile_size=Config.TILE_SIZE,
+                            tile_overlap=Config.TILE_OVERLAP, tile_min_side=Config.TILE_MIN_SIDE,
+                            roi_max_fraction=Config.ROI_MAX_FRACTION, audit_every=Config.PLAN_AUDIT_EVERY,
+                            conf_threshold=Config.PERSON_CONF_THRESHOLD)
+
+def model_kwargs(model=None, imgsz=None, conf=None, max_det=None):
+    """Scheduler arguments for a feed's inference settings.
+
+    Defaults are left out, so feeds running on them share model calls.
+    """
+    kwargs = {}
+    if model and model != Config.YOLO_MODEL:
+        kwargs["model"] = model
+    if imgsz and int(imgsz) != Config.INFERENCE_IMGSZ:
+        kwargs["imgsz"] = int(imgsz)
+    if conf is not None:
+        kwargs["conf"] = float(conf)
+    if max_det is not None:
+        kwargs["max_det"] = int(max_det)
+    return kwargs
+
+def variant_ready(name):
+    # Worker processes load other variants on their first call
+    return inference_pool is not None or model_registry.is_ready(name)
+
+def load_variant(name):
+    if inference_pool is None:
+        model_registry.load_async(name)
+
+def make_tuner(settings):
+    """LatencyTuner over the input size ladder of the feed's model, then the larger variants after it."""
+    model = settings["model"] or Config.YOLO_MODEL
+    ladder = Config.INFERENCE_MODEL_LADDER
+    models = ladder[ladder.index(model):] if model in ladder else [model]
+    steps = tuning_steps(Config.INFERENCE_IMGSZ_LADDER, models)
+    imgsz = settings["imgsz"] or Config.INFERENCE_IMGSZ
+    start = min(range(len(steps)), key=lambda i: (steps[i][0] != model, abs(steps[i][1] - imgsz)))
+    return LatencyTuner(steps, settings["latency_budget_ms"], start, window=Config.INFERENCE_TUNE_WINDOW,
+                        is_ready=variant_ready, prepare=load_variant)
+
+def preload_model():
+    """Start loading the model (or the worker processes) in the background."""
+    if inference_pool:
+        threading.Thread(target=inference_pool.start, daemon=True).start()
+    else:
+        model_registry.load_async()
 
-# Warm up the model with a dummy inference to reduce first inference delay
-dummy_frame = np.zeros((640, 640, 3), dtype=np.uint8)
-_ = model(dummy_frame, stream=True)
-print("Model warmed up")
+def model_status():
+    return inference_pool.status() if inference_pool else model_registry.status()
 
 # Shared state
 analysis_threads = {}
 analysis_results = {}
 analysis_detections = {}
-stop_flags = {}  # Add stop flags for each feed
-frame_queues = {}  # Queues for MJPEG frames per feed
-latest_frame = {}  # Latest frame for polling
-deepsort_trackers = {}  # DeepSort trackers per feed
-deepsort_enabled = {}  # Toggle state per feed
-
-def is_in_zone(x1, y1, x2, y2, zone_coords):
-    zx1, zy1, zx2, zy2 = zone_coords
-    cx = int((x1 + x2) / 2)
-    cy = int((y1 + y2) / 2)
-    return zx1 <= cx <= zx2 and zy1 <= cy <= zy2
-
-
-def run_analysis(feed_id, video_source, zones, zone_labels):
-    print(f"Starting analysis thread for feed {feed_id}")
-    print(f"Video source: {video_source}")
-    print(f"Zones: {zones}")
-    print(f"Zone labels: {zone_labels}")
-
-    # Handle both file paths and camera indices
-    if isinstance(video_source, int):
-        # Camera feed
-        cap = cv2.VideoCapture(video_source)
-    else:
-        # Video file
-        cap = cv2.VideoCapture(video_source)
-
-    if not cap.isOpened():
-        print(f"Failed to open video source: {video_source}")
+stop_flags = {}  # Stop event of each feed's current analysis thread
+broadcasters = {}  # MJPEG frame broadcasters per feed
+result_notifier = ResultNotifier()  # Versioned latest result per feed for event streams
+feed_trackers = {}  # Tracker per feed, absent while tracking is off
+motion_gates = {}  # Motion gate settings per feed, replaced (not mutated) on change
+DEFAULT_MOTION_GATE = {"enabled": True, "zones_only": False} if Config.MOTION_GATE_ENABLED else None
+inference_plans = {}  # Inference plan mode per feed
+keyframe_settings = {}  # Keyframe interval settings per feed, replaced (not mutated) on change
+DEFAULT_KEYFRAMES = {"interval": Config.KEYFRAME_INTERVAL, "adaptive": Config.KEYFRAME_ADAPTIVE,
+                     "max_interval": Config.KEYFRAME_MAX_INTERVAL}
+inference_settings = {}  # Model/input size/confidence settings per feed, replaced (not mutated) on change
+DEFAULT_INFERENCE = {"model": None, "imgsz": None, "conf": None, "max_det": None,
+                     "auto_tune": Config.INFERENCE_AUTO_TUNE, "latency_budget_ms": Config.INFERENCE_LATENCY_BUDGET_MS}
+feed_stats = {}  # Capture/analysis counters per feed
+
+def run_analysis(feed_id, video_source, zones=None, zone_labels=None, realtime=True, target_fps=None,
+                 stop_event=None):
+    """Analysis loop of one feed, until ``stop_event`` is set.
+
+    Without ``zones`` they come from the zone cache and edits apply live.
+    """
+    stop_event = stop_event or threading.Event()
+    log = feed_log(feed_id)
+    log.info("Starting analysis of %s", video_source)
+
+    # Camera indices are live sources (newest frame wins), file paths are read in full
+    grabber = FrameGrabber(video_source)
+    if not grabber.isOpened():
+        log.warning("Failed to open video source: %s", video_source)
+        grabber.stop()
+        if analysis_threads.get(feed_id) is threading.current_thread():
+            del analysis_threads[feed_id]
         return
-
-    frame_count = 0
-    while cap.isOpened():
-        # Check if we should stop
-        if stop_flags.get(feed_id, False):
-            print(f"Stopping analysis thread for feed {feed_id} due to stop flag")
-            break
-
-        ret, frame = cap.read()
-        if not ret:
-            print(f"End of video reached after {frame_count} frames")
-            break
-
-        frame_count += 1
-        zone_counts = [0] * len(zones)
-        results = model(frame, stream=True)
-
-        detections = []
-        person_count = 0
-
-        # Prepare detections for DeepSort if enabled
-        deepsort_dets = []
-        for result in results:
-            for box in result.boxes:
-                cls_id = int(box.cls[0])
-                if model.names[cls_id] == "person":
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    conf = float(box.conf[0])
-                    
-                    w,h=x2-x1,y2-y1
-                    deepsort_dets.append([[x1,y1,w,h], conf, "person"])
-
-        # Apply DeepSort tracking if enabled
-        if deepsort_enabled.get(feed_id, False) and deepsort_available and feed_id in deepsort_trackers:
-            tracks = deepsort_trackers[feed_id].update_tracks(deepsort_dets, frame=frame)
-            for track in tracks:
-                if not track.is_confirmed():
-                    continue
-                track_id = track.track_id
-                ltrb = track.to_ltrb()
-                x1, y1, x2, y2 = map(int, ltrb)
-                
-                cls_id = track.get_det_class() if hasattr(track, 'get_det_class') else "person"
-                label = cls_id if isinstance(cls_id, str) else (results[0].names[cls_id] if cls_id is not None else "person")
-
-                person_count += 1
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)  # Blue color (BGR format)
-                cv2.putText(frame, f"Person {track_id} ({label})", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)  # Blue color (BGR format)
-
-                # Show DeepSort track IDs on console
-                print(f"DeepSort Track ID: {track_id}  at bbox ({x1}, {y1}, {x2}, {y2})")
-
-                # Check which zones this person is in
-                for i, (zx1, zy1, zx2, zy2) in enumerate(zones):
-                    cx = int((x1 + x2) / 2)
-                    cy = int((y1 + y2) / 2)
-                    print(f"Checking person center ({cx}, {cy}) against zone {zone_labels[i]} bounds ({zx1}, {zy1}, {zx2}, {zy2})")
-                    if zx1 <= cx <= zx2 and zy1 <= cy <= zy2:
-                        zone_counts[i] += 1
-                        print(f"✓ Person {track_id} at ({x1},{y1},{x2},{y2}) is in zone {zone_labels[i]}")
-
-                detections.append({"bbox": [x1, y1, x2, y2], "label": "person", "track_id": track_id})
+    grabber.start()
+
+    stats = feed_stats[feed_id] = {"frames_analyzed": 0, "frames_captured": 0, "dropped_frames": 0,
+                                   "skipped_frames": 0, "latency_ms": 0.0}
+    cache_writer = None
+    embedding = False  # registered with the embedding scheduler
+    scheduler.register()
+    try:
+        # Compile zone polygons once for this source's resolution (cached ones once per edit)
+        live_zones = zones is None
+        if live_zones:
+            zone_index = feed_zone_index(feed_id, grabber.width, grabber.height)
         else:
-            # Use basic YOLO detections without tracking
-            for det in deepsort_dets:
-                x1, y1, w,h  = det[0]
-                x2 = x1 + w
-                y2 = y1 + h
-                person_count += 1
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)  # Blue color (BGR format)
-                cv2.putText(frame, "Person", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)  # Blue color (BGR format)
-
-                # Check which zones this person is in
-                for i, (zx1, zy1, zx2, zy2) in enumerate(zones):
-                    cx = int((x1 + x2) / 2)
-                    cy = int((y1 + y2) / 2)
-                    print(f"Checking person center ({cx}, {cy}) against zone {zone_labels[i]} bounds ({zx1}, {zy1}, {zx2}, {zy2})")
-                    if zx1 <= cx <= zx2 and zy1 <= cy <= zy2:
-                        zone_counts[i] += 1
-                        print(f"✓ Person at ({x1},{y1},{x2},{y2}) is in zone {zone_labels[i]}")
-
-                detections.append({"bbox": [x1, y1, x2, y2], "label": "person"})
-
-        # Create the results dictionary
-        zones_dict = {zone_labels[i]: count for i, count in enumerate(zone_counts)}
-        analysis_results[feed_id] = {
-            "total": person_count,  # Total people detected in the entire frame
-            "zones": zones_dict     # People detected within specific zones
-        }
-        analysis_detections[feed_id] = detections
-
-        # Draw zones on the frame
-        for i, (zx1, zy1, zx2, zy2) in enumerate(zones):
-            cv2.rectangle(frame, (zx1, zy1), (zx2, zy2), (0, 255, 0), 2)  # Green color for zones
-            # cv2.putText(frame, str(zone_counts[i]), (zx1, zy1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)  # Red color for live count
-
-        # Encode frame to JPEG and enqueue for streaming
-        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        jpeg_bytes = buffer.tobytes()
-        if feed_id in frame_queues:
-            try:
-                frame_queues[feed_id].put(jpeg_bytes, block=False)
-            except queue.Full:
-                pass  # Skip frame if queue is full
-        latest_frame[feed_id] = jpeg_bytes
-
-        print(f"Frame {frame_count}: Found {person_count} persons, zone counts: {zones_dict}")
-
-        time.sleep(0.2)  # prevent 100% CPU
-
-    cap.release()
-    print(f"Analysis thread for feed {feed_id} finished")
-
-def start_analysis(feed_id, video_source, zones, zone_labels=None):
+            zone_index = ZoneIndex(zones, zone_labels, grabber.width, grabber.height)
+        log.info("Zones: %s", zone_index.labels)
+        log.debug("Zone polygons: %s", [p.tolist() for p in zone_index.polygons])
+        broadcaster = get_broadcaster(feed_id)
+        renderer = FrameRenderer(Config.STREAM_MAX_WIDTH, Config.STREAM_JPEG_QUALITY)
+        if target_fps is None:
+            target_fps = Config.ANALYSIS_TARGET_FPS
+        pacer = FramePacer(target_fps, native_fps=0.0 if grabber.live else grabber.fps, realtime=realtime)
+        plan_mode = inference_plans.get(feed_id, Config.INFERENCE_PLAN)
+        planner = make_planner(zone_index, grabber.width, grabber.height, plan_mode)
+        log.info("Inference plan: %s", planner.stats())
+        frame_total = 0 if grabber.live else int(grabber.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cache_for, cached = None, None
+        stats["cache_hits"] = 0
+        tune_settings, tuner = None, None
+        timer = StageTimer()
+        spans = span_buffer(feed_id, reset=True)
+        stage_histograms = {stage: metrics.stage_seconds.labels(feed=feed_id, stage=stage) for stage in STAGES}
+        gate_settings, gate = None, None
+        keyframe_config, keyframes = None, None
+        stats["detector_skipped"] = 0
+        dets, boxes, track_ids = None, np.zeros((0, 4), dtype=int), None
+        frame_count = 0
+        while True:
+            # Check if we should stop
+            if stop_event.is_set():
+                log.info("Stop requested after %d frames", frame_count)
+                break
+
+            # Files skip ahead to the frame due on the playback clock, cameras just take the newest
+            captured = grabber.read(timeout=1.0, min_index=pacer.source_index())
+            if captured is None:
+                if grabber.ended:
+                    log.info("End of video reached after %d frames", frame_count)
+                    break
+                continue  # No new frame yet, re-check the stop flag
+            frame = captured.frame
+            pacer.begin()
+            timer.begin()
+            timer.add("decode", captured.decode_seconds)
+
+            frame_count += 1
+            tracker = feed_trackers.get(feed_id)
+            if (getattr(tracker, "embedder", None) is not None) != embedding:
+                embedding = not embedding
+                if embedding:
+                    embed_scheduler.register()
+                else:
+                    embed_scheduler.unregister()
+
+            # Zone edits apply live: the recompiled zones are swapped in on the next frame
+            if live_zones and zone_cache.version(feed_id) != zone_index.version:
+                zone_index = feed_zone_index(feed_id, grabber.width, grabber.height)
+                planner = make_planner(zone_index, grabber.width, grabber.height, plan_mode)
+                gate_settings = None  # rebuilds the motion gate's zone mask
+                log.info("Zones updated: %s; inference plan: %s", zone_index.labels, planner.stats())
+
+            # Motion gate: while nothing moves the last detections stay valid
+            settings = motion_gates.get(feed_id, DEFAULT_MOTION_GATE)
+            if settings is not gate_settings:
+                gate_settings, gate = settings, None
+                if settings is not None and settings["enabled"]:
+                    mask = zone_index.coverage() if settings["zones_only"] and len(zone_index) else None
+                    gate = MotionGate(mask, pixel_threshold=Config.MOTION_GATE_PIXEL_THRESHOLD,
+                                      min_changed=Config.MOTION_GATE_MIN_CHANGED, max_skip=Config.MOTION_GATE_MAX_SKIP)
+
+            if inference_plans.get(feed_id, Config.INFERENCE_PLAN) != plan_mode:
+                plan_mode = inference_plans.get(feed_id, Config.INFERENCE_PLAN)
+                planner = make_planner(zone_index, grabber.width, grabber.height, plan_mode)
+                log.info("Inference plan: %s", planner.stats())
+
+            # Inference settings: fixed per feed, or moved along the ladder by the latency tuner
+            inference = inference_settings.get(feed_id, DEFAULT_INFERENCE)
+            if inference is not tune_settings:
+                tune_settings = inference
+                tuner = make_tuner(inference) if inference["auto_tune"] else None
+            model, imgsz = tuner.step if tuner is not None else (inference["model"], inference["imgsz"])
+            kwargs = model_kwargs(model, imgsz, inference["conf"], inference["max_det"])
+            conf_threshold = inference["conf"] if inference["conf"] is not None else Config.PERSON_CONF_THRESHOLD
+
+            # Cached detections only hold for the plan and settings they were made with
+            if cache_for != (planner, kwargs):
+                if cache_writer is not None:
+                    cache_writer.commit()
+                cache_for = (planner, kwargs)
+                cached, cache_writer = open_detection_cache(video_source, frame_total, planner.key(), kwargs)
+
+            # Keyframes: with a tracker the detector only runs every few frames
+            config = keyframe_settings.get(feed_id, DEFAULT_KEYFRAMES)
+            if config is not keyframe_config:
+                keyframe_config = config
+                keyframes = KeyframeScheduler(config["interval"], config["adaptive"], config["max_interval"],
+                                              Config.KEYFRAME_MAX_SHIFT) if config["interval"] > 1 else None
+            keyframe_due = tracker is None or keyframes is None or keyframes.next_frame()
+
+            detect = dets is None or (keyframe_due and (gate is None or gate.check(frame)))
+
+            if detect:
+                # Re-analysed files replay cached detections instead of running the model
+                raw = cached.get(captured.index) if cached is not None else None
+                # Cached output was class-filtered by the model before it was written, so a replay
+                # needs neither the class id nor the weights (nor, in process mode, the workers)
+                class_id = None
+                if raw is None:
+                    started = time.perf_counter()
+                    raw = planner.submit(frame, **kwargs).result()
+                    if tuner is not None and tuner.observe(time.perf_counter() - started):
+                        log.info("Inference settings: %s", tuner.stats())
+                    if cache_writer is not None:
+                        cache_writer.add(captured.index, raw)
+                    class_id = person_class_id()
+                else:
+                    stats["cache_hits"] += 1
+                timer.lap("inference")
+                dets = filter_detections(raw, class_id, conf_threshold)
+                boxes = dets.xyxy.astype(int)
+                track_ids = None
+                timer.lap("postprocess")
+                if tracker is not None:
+                    track_ids, boxes = tracker.update(boxes, dets.conf, frame)
+                    if keyframes is not None:
+                        keyframes.keyframe(track_ids, boxes)
+                    timer.lap("tracking")
+            else:
+                stats["detector_skipped"] += 1
+                # Without a tracker the previous frame's boxes are reused as they are
+                if tracker is not None:
+                    track_ids, boxes = tracker.predict(frame)
+                    timer.lap("tracking")
+
+            # Stopped while waiting on the model (e.g. a lazy load): publish nothing more
+            if stop_event.is_set():
+                log.info("Stop requested after %d frames", frame_count)
+                break
+
+            # Zone membership for every person at once, counts are the column sums
+            membership = zone_index.membership(boxes)
+            zone_counts = count_zones(membership)
+            person_count = len(boxes)
+            timer.lap("zones")
+
+            # Confidences are per detection, so they are only reported without tracking
+            detections = FeedDetections(boxes, track_ids, dets.conf if track_ids is None else None)
+
+            # Create the results dictionary
+            zones_dict = {zone_index.labels[i]: count for i, count in enumerate(zone_counts)}
+            analysis_results[feed_id] = {
+                "total": person_count,  # Total people detected in the entire frame
+                "zones": zones_dict     # People detected within specific zones
+            }
+            analysis_detections[feed_id] = detections
+            count_history.record(feed_id, analysis_results[feed_id])
+            result_notifier.publish(feed_id, {"state": "running", "counts": analysis_results[feed_id], "detections": detections})
+            timer.lap("publish")
+
+            # Annotate and encode only when someone is watching the stream
+            if broadcaster.subscribers > 0:
+                canvas = renderer.draw(frame, boxes, track_ids, zone_index)
+                timer.lap("drawing")
+                jpeg = renderer.encode(canvas)
+                timer.lap("encode")
+                broadcaster.publish(jpeg)
+
+            stats["frames_analyzed"] = frame_count
+            stats["frames_captured"] = grabber.frames_read
+            stats["dropped_frames"] = grabber.dropped
+            stats["skipped_frames"] = grabber.skipped
+            stats["latency_ms"] = (time.monotonic() - captured.timestamp) * 1000
+            stats["stream_subscribers"] = broadcaster.subscribers
+            stats["stage_ms"] = timer.mean_ms()
+            stats["tracks"] = len(track_ids) if track_ids is not None else None
+            stats["motion_gate"] = gate.stats() if gate is not None else None
+            stats["inference_plan"] = planner.stats()
+            stats["inference_settings"] = {"model": model or Config.YOLO_MODEL, "imgsz": imgsz or Config.INFERENCE_IMGSZ,
+                                           "conf": conf_threshold, "max_det": inference["max_det"],
+                                           "tuner": tuner.stats() if tuner is not None else None}
+            stats["keyframes"] = keyframes.stats() if keyframes is not None and tracker is not None else None
+            stats["embeddings"] = tracker.embedder.stats() if embedding else None
+            for stage, seconds in timer.last.items():
+                stage_histograms[stage].observe(seconds)
+            spans.record(frame_count, timer.started, timer.last)
+            stats.update(pacer.stats())
+
+            log.frame(frame_count, "Frame %d: %d persons, zone counts: %s", frame_count, person_count, zones_dict)
+
+            pacer.wait()  # sleep only for what is left of the frame interval
+    except Exception as e:
+        # A failed model load or batch ends the feed, but never leaves it looking like it runs
+        log.exception("Analysis failed: %s", e)
+        stats["error"] = str(e)
+    finally:
+        scheduler.unregister()
+        if embedding:
+            embed_scheduler.unregister()
+        grabber.stop()
+        if cache_writer is not None:
+            cache_writer.commit()  # merged with frames cached by earlier runs
+        if analysis_threads.get(feed_id) is threading.current_thread():
+            del analysis_threads[feed_id]
+        log.info("Analysis thread finished")
+
+def start_analysis(feed_id, video_source, zones=None, zone_labels=None, realtime=True, target_fps=None):
+    """Start the feed's analysis thread (unless it runs) and return it; the thread removes itself when it ends."""
     if feed_id in analysis_threads:
-        return
-    if zone_labels is None:
+        return analysis_threads[feed_id]
+    if zones is not None and zone_labels is None:
         zone_labels = [f"Zone {i+1}" for i in range(len(zones))]
-    # Clear any existing stop flag
-    stop_flags.pop(feed_id, None)
-    frame_queues[feed_id] = queue.Queue(maxsize=5)
-    t = threading.Thread(target=run_analysis, args=(feed_id, video_source, zones, zone_labels), daemon=True)
+    if feed_id in broadcasters and broadcasters[feed_id].closed:
+        del broadcasters[feed_id]
+    # Each thread gets its own stop event, so a stop is never lost if the thread outlives stop_analysis
+    stop_event = stop_flags[feed_id] = threading.Event()
+    t = threading.Thread(target=run_analysis, daemon=True,
+                         args=(feed_id, video_source, zones, zone_labels, realtime, target_fps, stop_event))
     analysis_threads[feed_id] = t
     t.start()
+    return t
 
 def stop_analysis(feed_id):
-    print(f"Stopping analysis for feed {feed_id}")
-    stop_flags[feed_id] = True  # Set stop flag
+    log = feed_log(feed_id)
+    log.info("Stopping analysis")
+    stop_event = stop_flags.pop(feed_id, None)
+    if stop_event is not None:
+        stop_event.set()  # the thread holds on to it, so even a late check sees the stop
 
     # Wait for thread to finish if it exists
     if feed_id in analysis_threads:
         thread = analysis_threads[feed_id]
         thread.join(timeout=1.0)  # Wait up to 1 second for thread to finish
         if thread.is_alive():
-            print(f"Warning: Thread for feed {feed_id} did not stop gracefully")
-        del analysis_threads[feed_id]
+            log.warning("Analysis thread did not stop gracefully")
+        analysis_threads.pop(feed_id, None)  # a finished thread removes itself
 
     # Clean up after thread has stopped
     analysis_results.pop(feed_id, None)
     analysis_detections.pop(feed_id, None)
-    stop_flags.pop(feed_id, None)  # Clean up stop flag
-    if feed_id in frame_queues:
-        del frame_queues[feed_id]
-    if feed_id in latest_frame:
-        del latest_frame[feed_id]
-    print(f"Analysis stopped for feed {feed_id}")
+    feed_stats.pop(feed_id, None)
+    metrics.forget_feed(feed_id)
+    broadcaster = broadcasters.pop(feed_id, None)
+    if broadcaster is not None:
+        broadcaster.close()  # ends every open stream for this feed
+    result_notifier.publish(feed_id, {"state": "stopped", "counts": get_counts(feed_id), "detections": empty_feed_detections()})
+    log.info("Analysis stopped")
 
 def get_counts(feed_id):
     return analysis_results.get(feed_id, {"total": 0, "zones": {}})
 
 def get_detections(feed_id):
-    return analysis_detections.get(feed_id, [])
+    detections = analysis_detections.get(feed_id)
+    return detections_to_dicts(detections) if detections is not None else []
+
+def get_versioned_result(feed_id):
+    """Return ``(version, counts, FeedDetections)`` of the latest result, all from the same frame."""
+    version, payload = result_notifier.latest(feed_id)
+    if payload is None:
+        return 0, get_counts(feed_id), empty_feed_detections()
+    return version, payload["counts"], payload["detections"]
+
+def get_stats(feed_id):
+    return feed_stats.get(feed_id, {})
+
+def collect_metrics():
+    """Refresh the scrape-time gauges from the current analysis state."""
+    for feed_id, stats in list(feed_stats.items()):
+        metrics.feed_fps.labels(feed=feed_id).set(stats.get("achieved_fps", 0.0))
+        metrics.feed_latency_seconds.labels(feed=feed_id).set(stats.get("latency_ms", 0.0) / 1000)
+        metrics.feed_people.labels(feed=feed_id).set(get_counts(feed_id)["total"])
+        metrics.feed_subscribers.labels(feed=feed_id).set(stats.get("stream_subscribers", 0))
+        metrics.feed_frames.labels(feed=feed_id).set(stats.get("frames_analyzed", 0))
+        metrics.feed_dropped.labels(feed=feed_id).set(stats.get("dropped_frames", 0))
+        metrics.feed_skipped.labels(feed=feed_id).set(stats.get("skipped_frames", 0))
+        if stats.get("tracks") is not None:
+            metrics.feed_tracks.labels(feed=feed_id).set(stats["tracks"])
+        if stats.get("inference_plan") is not None:
+            metrics.feed_inference_cost.labels(feed=feed_id).set(stats["inference_plan"]["cost"])
+            if stats["inference_plan"]["recall"] is not None:
+                metrics.feed_plan_recall.labels(feed=feed_id).set(stats["inference_plan"]["recall"])
+        if stats.get("frames_analyzed"):
+            metrics.feed_detector_skip_ratio.labels(feed=feed_id).set(
+                stats.get("detector_skipped", 0) / stats["frames_analyzed"])
+    metrics.inference_queue_depth.labels().set(scheduler.queue_depth)
+
+    status = model_status()
+    metrics.model_ready.labels().set(1 if status["ready"] else 0)
+    if inference_pool:
+        models = [worker["model"] for worker in status["workers"].values() if "model" in worker]
+    else:
+        models = status["models"].values()
+    for model in models:
+        if model["load_seconds"] is not None:
+            metrics.model_load_seconds.labels(model=model["name"]).set(model["load_seconds"])
+        if model["warmup_seconds"] is not None:
+            metrics.model_warmup_seconds.labels(model=model["name"]).set(model["warmup_seconds"])
+
+metrics.REGISTRY.add_collector(collect_metrics)
+
+def set_tracker(feed_id, kind):
+    """Track a feed's people with ``kind`` ("bytetrack" or "deepsort"), or turn tracking off with None.
+
+    A running analysis switches on its next frame; track ids restart when the kind changes.
+    """
+    log = feed_log(feed_id)
+    if kind is None:
+        if feed_trackers.pop(feed_id, None) is not None:
+            log.info("Tracking disabled")
+        return None
+    current = feed_trackers.get(feed_id)
+    if current is None or current.name != kind:
+        embedder = None
+        if kind == "deepsort" and Config.EMBEDDING_BATCHED:
+            embedder = FeedEmbedder(embed_scheduler.submit, Config.EMBED_REUSE_IOU, Config.EMBED_MAX_REUSE,
+                                    Config.EMBED_CACHE_SIZE)
+        feed_trackers[feed_id] = create_tracker(kind, max_age=30, n_init=1, embedder=embedder)
+        log.info("Tracking with %s", kind)
+    return kind
+
+def get_tracker(feed_id):
+    tracker = feed_trackers.get(feed_id)
+    return {"tracker": tracker.name if tracker is not None else None,
+            "available": [kind for kind in TRACKERS if kind != "deepsort" or deepsort_available],
+            "tracks": get_stats(feed_id).get("tracks")}
 
 def toggle_deepsort(feed_id, enabled):
-    """Toggle DeepSort tracking for a feed"""
-    deepsort_enabled[feed_id] = enabled
-    if enabled and deepsort_available:
-        if feed_id not in deepsort_trackers:
-            deepsort_trackers[feed_id] = DeepSort(max_age=30, n_init=1)
-        print(f"DeepSort enabled for feed {feed_id}")
-    else:
-        if feed_id in deepsort_trackers:
-            del deepsort_trackers[feed_id]
-            
+    """Toggle tracking for a feed with Config.TRACKER (ByteTrack when DeepSort is not installed)"""
+    kind = Config.TRACKER if deepsort_available or Config.TRACKER != "deepsort" else "bytetrack"
+    set_tracker(feed_id, kind if enabled else None)
+
+def set_motion_gate(feed_id, enabled, zones_only=False):
+    """Turn the motion gate of a feed on or off; a running analysis picks it up on its next frame."""
+    motion_gates[feed_id] = {"enabled": bool(enabled), "zones_only": bool(zones_only)}
+    feed_log(feed_id).info("Motion gate %s", "enabled" if enabled else "disabled")
+    return motion_gates[feed_id]
+
+def get_motion_gate(feed_id):
+    settings = motion_gates.get(feed_id, DEFAULT_MOTION_GATE) or {"enabled": False, "zones_only": False}
+    return {**settings, "stats": get_stats(feed_id).get("motion_gate")}
+
+def set_inference_plan(feed_id, mode):
+    """Choose how a feed's frames are cropped/tiled for the detector; a running analysis switches on its next frame."""
+    if mode not in PLAN_MODES:
+        raise ValueError(f"mode must be one of {', '.join(PLAN_MODES)}")
+    inference_plans[feed_id] = mode
+    return mode
+
+def get_inference_plan(feed_id):
+    return {"mode": inference_plans.get(feed_id, Config.INFERENCE_PLAN),
+            "stats": get_stats(feed_id).get("inference_plan")}
+
+def set_inference_settings(feed_id, **changes):
+    """Update a feed's model variant, input size, confidence, max detections and auto-tuning.
+
+    Only the given settings change (None resets one to its default); a running
+    analysis picks them up on its next frame.
+    """
+    settings = dict(inference_settings.get(feed_id, DEFAULT_INFERENCE))
+    for name, value in changes.items():
+        if name not in DEFAULT_INFERENCE:
+            raise ValueError(f"Unknown inference setting: {name}")
+        settings[name] = DEFAULT_INFERENCE[name] if value is None else value
+    if settings["model"] is not None and settings["model"] not in Config.INFERENCE_MODEL_LADDER:
+        raise ValueError(f"model must be one of {', '.join(Config.INFERENCE_MODEL_LADDER)}")
+    if settings["imgsz"] is not None:
+        settings["imgsz"] = int(settings["imgsz"])
+        if settings["imgsz"] < 32 or settings["imgsz"] % 32:
+            raise ValueError("imgsz must be a positive multiple of 32")
+    if settings["conf"] is not None:
+        settings["conf"] = float(settings["conf"])
+        if not 0 < settings["conf"] < 1:
+            raise ValueError("conf must be between 0 and 1")
+    if settings["max_det"] is not None:
+        settings["max_det"] = int(settings["max_det"])
+        if settings["max_det"] < 1:
+            raise ValueError("max_det must be at least 1")
+    settings["auto_tune"] = bool(settings["auto_tune"])
+    settings["latency_budget_ms"] = float(settings["latency_budget_ms"])
+    if settings["latency_budget_ms"] <= 0:
+        raise ValueError("latency_budget_ms must be positive")
+    inference_settings[feed_id] = settings
+    feed_log(feed_id).info("Inference settings: %s", settings)
+    return settings
+
+def get_inference_settings(feed_id):
+    """Requested settings, the ones in use and the measured detector latency."""
+    stats = get_stats(feed_id)
+    return {**inference_settings.get(feed_id, DEFAULT_INFERENCE), "current": stats.get("inference_settings"),
+            "inference_ms": stats.get("stage_ms", {}).get("inference")}
+
+def set_keyframes(feed_id, interval, adaptive=True, max_interval=None):
+    """Run the detector every ``interval`` frames while tracking; a running analysis picks it up on its next frame."""
+    keyframe_settings[feed_id] = {"interval": max(1, int(interval)), "adaptive": bool(adaptive),
+                                  "max_interval": int(max_interval or Config.KEYFRAME_MAX_INTERVAL)}
+    return keyframe_settings[feed_id]
+
+def get_keyframes(feed_id):
+    return {**keyframe_settings.get(feed_id, DEFAULT_KEYFRAMES), "stats": get_stats(feed_id).get("keyframes")}
+
+def get_broadcaster(feed_id):
+    """Frame broadcaster for a feed, created on first use so clients can connect before analysis starts."""
+    return broadcasters.setdefault(feed_id, FrameBroadcaster())
+
 def generate_frames(feed_id):
-    """Generator for MJPEG stream frames."""
+    """Generator for MJPEG stream frames, woken only when a new frame is published."""
+    for frame_bytes in get_broadcaster(feed_id).subscribe():
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+
+def generate_events(feed_ids, last_event_id=None, heartbeat=15.0, min_interval=0.0):
+    """Server-Sent Events stream of result updates for one or more feeds.
+
+    Each update is sent as an ``update`` event whose id is ``<feed_id>:<version>``;
+    a reconnecting client's Last-Event-ID suppresses a repeat of the result it
+    already has. A comment line is sent every ``heartbeat`` seconds of silence.
+    """
+    versions = {feed_id: 0 for feed_id in feed_ids}
+    if last_event_id:
+        try:
+            feed_id, version = (int(part) for part in last_event_id.split(":"))
+            if feed_id in versions:
+                versions[feed_id] = version
+        except ValueError:
+            pass
+
+    yield "retry: 3000\n\n"  # reconnect delay for EventSource
     while True:
-        if stop_flags.get(feed_id, False):
-            break
-        if feed_id in latest_frame:
-            frame_bytes = latest_frame[feed_id]
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        time.sleep(0.033)  # Wait ~30ms for next frame
-
-def process_frame(image_data, zones, labels):
-    """Process a single frame for detections and zone counts."""
-    # Decode base64 image data
-    img_bytes = base64.b64decode(image_data)
-    nparr = np.frombuffer(img_bytes, np.uint8)
-    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-    zone_counts = [0] * len(zones)
-    results = model(frame, stream=True)
-
-    detections = []
-
-    for result in results:
-        for box in result.boxes:
-            cls_id = int(box.cls[0])
-            if model.names[cls_id] == "person":
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                conf = float(box.conf[0])
-
-                detections.append({"bbox": [x1, y1, x2, y2], "label": "person", "confidence": conf})
-
-                # Check which zones this person is in
-                cx = int((x1 + x2) / 2)
-                cy = int((y1 + y2) / 2)
-                for i, (zx1, zy1, zx2, zy2) in enumerate(zones):
-                    if zx1 <= cx <= zx2 and zy1 <= cy <= zy2:
-                        zone_counts[i] += 1
-
-    counts = {labels[i]: count for i, count in enumerate(zone_counts)}
-    return counts, detections
-
+        changed = result_notifier.wait(versions, timeout=heartbeat)
+        if not changed:
+            yield ": heartbeat\n\n"
+            continue
+        for feed_id in changed:
+            version, payload = result_notifier.latest(feed_id)
+            versions[feed_id] = version
+            data = json.dumps({"feed_id": feed_id, "version": version, "state": payload["state"],
+                               "counts": payload["counts"], "detections": detections_to_dicts(payload["detections"])})
+            yield f"id: {feed_id}:{version}\nevent: update\ndata: {data}\n\n"
+        if min_interval > 0:
+            time.sleep(min_interval)  # coalesce bursts; the next event carries the latest result
@@ -0,0 +1,76 @@
+import json
+import threading
+from collections import OrderedDict
+
+from zones import ZoneIndex, zone_polygon
+
+
+class ZoneCache:
+    """Zones of every feed, parsed once and compiled once per frame resolution.
+
+    ``set()`` stores a feed's Zone rows (editor canvas coordinates) under a new
+    version; the zone endpoints call it after every edit, so analysis loops
+    that watch ``version()`` swap in the new zones on their next frame.
+    ``index()`` returns the feed's ZoneIndex at a resolution, compiled on
+    first use and kept for the ``max_compiled`` most recently used
+    (feed, resolution) pairs.
+    """
+
+    def __init__(self, canvas_width=640, canvas_height=360, max_compiled=64):
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+        self.max_compiled = max_compiled
+        self._feeds = {}  # feed_id -> (version, labels, polygons in canvas coordinates)
+        self._compiled = OrderedDict()  # (feed_id, width, height) -> ZoneIndex
+        self._next_version = 1
+        self._lock = threading.Lock()
+
+    def set(self, feed_id, zone_rows):
+        """Replace a feed's zones with these Zone rows; returns the new version."""
+        labels = [z.label for z in zone_rows]
+        polygons = [zone_polygon(json.loads(z.coordinates)) for z in zone_rows]
+        with self._lock:
+            version = self._next_version
+            self._next_version += 1
+            self._feeds[feed_id] = (version, labels, polygons)
+            for key in [k for k in self._compiled if k[0] == feed_id]:
+                del self._compiled[key]
+        return version
+
+    def forget(self, feed_id):
+        with self._lock:
+            self._feeds.pop(feed_id, None)
+            for key in [k for k in self._compiled if k[0] == feed_id]:
+                del self._compiled[key]
+
+    def loaded(self, feed_id):
+        return feed_id in self._feeds
+
+    def version(self, feed_id):
+        """Version of a feed's zones, 0 if they are not cached."""
+        entry = self._feeds.get(feed_id)
+        return entry[0] if entry is not None else 0
+
+    def index(self, feed_id, width, height):
+        """The feed's zones compiled for ``width`` x ``height`` frames, None if they are not cached."""
+        key = (feed_id, int(width), int(height))
+        with self._lock:
+            index = self._compiled.get(key)
+            if index is not None:
+                self._compiled.move_to_end(key)
+                return index
+            entry = self._feeds.get(feed_id)
+            if entry is None:
+                return None
+            version, labels, polygons = entry
+            # Same scaling as helpers.scale_zones
+            scale_x, scale_y = width / self.canvas_width, height / self.canvas_height
+            scaled = [[(int(x * scale_x), int(y * scale_y)) for x, y in points] for points in polygons]
+            index = ZoneIndex(scaled, labels, width, height, version)
+            self._compiled[key] = index
+            while len(self._compiled) > self.max_compiled:
+                self._compiled.popitem(last=False)
+            return index
+
+
+zone_cache = ZoneCache()
@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+
+from postprocess import centroids
+
+# Order in which the corner keys saved by the zone editor form a closed polygon
+CORNER_ORDER = ("topleft", "topright", "bottomright", "bottomleft")
+
+
+def zone_polygon(coords):
+    """Return the polygon vertices of a stored zone as a list of [x, y].
+
+    Accepts the editor's corner dict (``topleft``/``topright``/...), a dict with a
+    ``points`` list for free-form polygons, or a plain list of points.
+    """
+    if isinstance(coords, dict):
+        if "points" in coords:
+            return [list(p) for p in coords["points"]]
+        if all(k in coords for k in CORNER_ORDER):
+            return [list(coords[k]) for k in CORNER_ORDER]
+        return [list(p) for p in coords.values()]
+    return [list(p) for p in coords]
+
+
+class ZoneIndex:
+    """Zones compiled for one frame resolution into a per-pixel bit mask.
+
+    Bit ``i`` of the mask is set on every pixel covered by zone ``i``, packed eight
+    zones per uint8 plane, so overlapping zones are supported. Membership of N
+    detections is a single gather of their centroids from the mask, whatever the
+    number or shape of the zones. ``version`` identifies the zone edit it was
+    compiled from (see zone_cache.py).
+    """
+
+    def __init__(self, polygons, labels, width, height, version=0):
+        self.width, self.height = int(width), int(height)
+        self.version = version
+        self.labels = list(labels)
+        self.polygons = [np.round(np.asarray(p, dtype=np.float64)).astype(np.int32).reshape(-1, 2)
+                         for p in polygons]
+        n_planes = max(1, (len(self.polygons) + 7) // 8)
+        self.mask = np.zeros((n_planes, self.height, self.width), dtype=np.uint8)
+        layer = np.empty((self.height, self.width), dtype=np.uint8)
+        for i, poly in enumerate(self.polygons):
+            layer.fill(0)
+            cv2.fillPoly(layer, [poly], 1 << (i % 8))
+            self.mask[i // 8] |= layer
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def membership_points(self, points):
+        """N x Z boolean matrix for integer (x, y) points; points off the frame are in no zone."""
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        bits = self.mask[:, np.clip(y, 0, self.height - 1), np.clip(x, 0, self.width - 1)].T
+        bits[~inside] = 0
+        return np.unpackbits(bits, axis=1, bitorder="little")[:, :len(self.polygons)].astype(bool)
+
+    def membership(self, xyxy):
+        """N x Z boolean matrix: True where the centre of box i lies in zone j."""
+        return self.membership_points(centroids(np.asarray(xyxy).reshape(-1, 4)))
+
+    def coverage(self):
+        """H x W boolean mask of the pixels covered by any zone."""
+        return self.mask.any(axis=0)
+
+    def bounding_boxes(self):
+        """Axis-aligned (x1, y1, x2, y2) box of every zone, clipped to the frame."""
+        boxes = np.zeros((len(self.polygons), 4), dtype=np.int32)
+        for i, poly in enumerate(self.polygons):
+            boxes[i, :2] = np.clip(poly.min(axis=0), 0, [self.width - 1, self.height - 1])
+            boxes[i, 2:] = np.clip(poly.max(axis=0), 0, [self.width - 1, self.height - 1])
+        return boxes
+
+    def draw(self, frame, color=(0, 255, 0), thickness=2, scale=1.0):
+        if self.polygons:
+            polygons = self.polygons if scale == 1.0 else [(p * scale).astype(np.int32) for p in self.polygons]
+            cv2.polylines(frame, polygons, True, color, thickness)